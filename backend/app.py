@@ -1,6 +1,8 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask.json import JSONEncoder
 from flask_cors import CORS
+import csv
+import io
 import os
 import sys
 import threading
@@ -11,7 +13,10 @@ from decimal import Decimal
 # 添加当前目录到Python路径
 sys.path.append(os.path.dirname(__file__))
 
-from db import db_manager
+from db import db_manager, chunked
+from category_cache import category_tree
+from suggest_index import suggest_index
+from cache import count_cache, item_detail_cache, listing_cache
 from routes.user_routes import user_bp
 from routes.item_routes import item_bp
 from routes.order_routes import order_bp
@@ -26,45 +31,78 @@ from routes.upload_routes import upload_bp
 # ============================================
 ORDER_TIMEOUT_MINUTES = 60  # 1小时未支付自动取消
 CHECK_INTERVAL_SECONDS = 300  # 每5分钟检查一次
+CANCEL_BATCH_SIZE = 500  # 每个事务最多取消的订单数
 
 def cancel_timeout_orders():
-    """取消超时未支付的订单"""
+    """取消超时未支付的订单
+
+    每批最多 CANCEL_BATCH_SIZE 个订单：锁定超时订单后用两条 IN 列表 UPDATE
+    （订单状态 + 商品状态）完成整批取消，而不是每个订单两次往返。
+    """
     try:
         # 查找超时订单
         find_sql = """
-        SELECT order_id, item_id, buyer_id, order_number
+        SELECT order_id
         FROM `order`
         WHERE order_status = 'pending_payment'
           AND TIMESTAMPDIFF(MINUTE, create_time, NOW()) > %s
         """
-        timeout_orders = db_manager.execute_query(find_sql, (ORDER_TIMEOUT_MINUTES,))
+        timeout_orders = db_manager.execute_query(find_sql, (ORDER_TIMEOUT_MINUTES,), result='tuple')
 
         if not timeout_orders:
             return 0
 
         cancelled_count = 0
-        for order in timeout_orders:
+        for batch in chunked([row[0] for row in timeout_orders], CANCEL_BATCH_SIZE):
             try:
-                # 更新订单状态为已取消
-                update_order_sql = """
-                UPDATE `order`
-                SET order_status = 'cancelled',
-                    notes = CONCAT(IFNULL(notes, ''), ' [系统自动取消：超时未支付]')
-                WHERE order_id = %s AND order_status = 'pending_payment'
-                """
-                rows = db_manager.execute_update(update_order_sql, (order['order_id'],))
-
-                if rows > 0:
-                    # 恢复商品状态
-                    restore_item_sql = """
-                    UPDATE item SET status = 'available' WHERE item_id = %s
+                placeholders = ','.join(['%s'] * len(batch))
+                with db_manager.transaction():
+                    # 锁定仍处于待支付状态的订单（期间可能已被支付或手动取消）
+                    lock_sql = f"""
+                    SELECT o.order_id, o.item_id, o.order_number, i.category_id, i.status AS item_status
+                    FROM `order` o
+                    JOIN item i ON o.item_id = i.item_id
+                    WHERE o.order_id IN ({placeholders}) AND o.order_status = 'pending_payment'
+                    FOR UPDATE
+                    """
+                    locked = db_manager.execute_query(lock_sql, batch, result='record')
+                    if not locked:
+                        continue
+
+                    locked_ids = [order.order_id for order in locked]
+                    locked_placeholders = ','.join(['%s'] * len(locked_ids))
+
+                    # 更新订单状态为已取消
+                    update_order_sql = f"""
+                    UPDATE `order`
+                    SET order_status = 'cancelled',
+                        notes = CONCAT(IFNULL(notes, ''), ' [系统自动取消：超时未支付]')
+                    WHERE order_id IN ({locked_placeholders})
                     """
-                    db_manager.execute_update(restore_item_sql, (order['item_id'],))
-                    cancelled_count += 1
-                    print(f"[订单超时] 已取消订单 {order['order_number']}")
+                    db_manager.execute_update(update_order_sql, locked_ids)
+
+                    # 恢复商品状态：只恢复仍为 sold 的商品（商品行已随订单一起锁定，
+                    # 这里筛出的就是 UPDATE 实际修改的行；已下架等状态的商品不重新上架）
+                    restored = [order for order in locked if order.item_status == 'sold']
+                    if restored:
+                        restore_item_sql = f"""
+                        UPDATE item SET status = 'available'
+                        WHERE item_id IN ({','.join(['%s'] * len(restored))}) AND status = 'sold'
+                        """
+                        db_manager.execute_update(restore_item_sql, [order.item_id for order in restored])
+
+                for order in restored:
+                    category_tree.adjust(order.category_id, 1)
+                count_cache.invalidate('item', 'order')
+                listing_cache.invalidate('item')
+                item_detail_cache.invalidate(*(f'item:{order.item_id}' for order in locked))
+                suggest_index.refresh(*(order.item_id for order in locked))
+                cancelled_count += len(locked)
+                for order in locked:
+                    print(f"[订单超时] 已取消订单 {order.order_number}")
 
             except Exception as e:
-                print(f"[订单超时] 取消订单 {order['order_id']} 失败: {e}")
+                print(f"[订单超时] 取消订单 {batch[0]}..{batch[-1]} 失败: {e}")
 
         return cancelled_count
 
@@ -73,6 +111,55 @@ def cancel_timeout_orders():
         return 0
 
 
+# ============================================
+# 商品收藏数校准任务
+# ============================================
+WISHLIST_RECONCILE_INTERVAL_SECONDS = 3600  # 每小时校准一次
+WISHLIST_RECONCILE_BATCH_SIZE = 1000  # 每条 UPDATE 覆盖的 item_id 区间大小
+
+
+def reconcile_wishlist_counts():
+    """按 wishlist 表重新计算 item.wishlist_count
+
+    收藏接口会同步维护该列，这里修正级联删除用户等绕过接口造成的偏差。
+    按 item_id 区间分批，每批一条 UPDATE（在同一连接上依次执行），只改写不一致的行；返回修正的商品数。
+    """
+    bounds = db_manager.execute_query("SELECT MIN(item_id), MAX(item_id) FROM item", result='tuple')
+    low, high = bounds[0] if bounds else (None, None)
+    if low is None:
+        return 0
+
+    reconcile_sql = """
+    UPDATE item i
+    LEFT JOIN (
+        SELECT item_id, COUNT(*) AS cnt
+        FROM wishlist
+        WHERE item_id BETWEEN %s AND %s
+        GROUP BY item_id
+    ) w ON w.item_id = i.item_id
+    SET i.wishlist_count = COALESCE(w.cnt, 0)
+    WHERE i.item_id BETWEEN %s AND %s AND i.wishlist_count <> COALESCE(w.cnt, 0)
+    """
+    ranges = ((start, start + WISHLIST_RECONCILE_BATCH_SIZE - 1)
+              for start in range(low, high + 1, WISHLIST_RECONCILE_BATCH_SIZE))
+    fixed = db_manager.execute_many(reconcile_sql, ((start, end, start, end) for start, end in ranges))
+    if fixed:
+        item_detail_cache.clear()
+    return fixed
+
+
+def wishlist_reconcile_checker():
+    """后台线程：定期校准商品收藏数"""
+    while True:
+        time.sleep(WISHLIST_RECONCILE_INTERVAL_SECONDS)
+        try:
+            fixed = reconcile_wishlist_counts()
+            if fixed > 0:
+                print(f"[收藏数校准] 修正 {fixed} 个商品的收藏数")
+        except Exception as e:
+            print(f"[收藏数校准] 校准任务异常: {e}")
+
+
 def order_timeout_checker():
     """后台线程：定期检查超时订单"""
     while True:
@@ -85,6 +172,28 @@ def order_timeout_checker():
             print(f"[订单超时] 检查任务异常: {e}")
 
 
+_background_jobs_lock = threading.Lock()
+_background_jobs_started = False
+
+
+def start_background_jobs():
+    """启动后台定时任务线程（超时订单取消、收藏数校准）
+
+    Flask 开发服务器和 ASGI 入口都会调用，同一进程内只启动一次。
+    """
+    global _background_jobs_started
+    with _background_jobs_lock:
+        if _background_jobs_started:
+            return
+        _background_jobs_started = True
+
+    threading.Thread(target=order_timeout_checker, daemon=True).start()
+    print("[订单超时] 后台检查任务已启动")
+
+    threading.Thread(target=wishlist_reconcile_checker, daemon=True).start()
+    print("[收藏数校准] 后台校准任务已启动")
+
+
 # 自定义JSON编码器，统一处理datetime格式（兼容Flask 2.0.x / Python 3.6）
 class CustomJSONEncoder(JSONEncoder):
     def default(self, obj):
@@ -102,9 +211,13 @@ app.json_encoder = CustomJSONEncoder  # 旧版Flask写法
 app.config['JSON_AS_ASCII'] = False  # 支持中文字符
 app.config['MAX_CONTENT_LENGTH'] = 60 * 1024 * 1024  # 允许最多约60MB上传（9*5MB + 余量）
 
+# 请求级数据库连接：每个请求最多借用一次连接，请求结束时归还
+db_manager.init_app(app)
+
 # 配置CORS,允许所有来源(开发环境)
+CORS_ORIGINS = ['http://localhost:3001', 'http://localhost:5173', 'http://127.0.0.1:3001', 'http://127.0.0.1:5173']
 CORS(app,
-     origins=['http://localhost:3001', 'http://localhost:5173', 'http://127.0.0.1:3001', 'http://127.0.0.1:5173'],
+     origins=CORS_ORIGINS,
      supports_credentials=True,
      allow_headers=['Content-Type', 'Authorization'],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'])
@@ -136,6 +249,7 @@ def health_check():
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
+            'pool': db_manager.pool_stats(),
             'timestamp': str(datetime.now())
         })
     except Exception as e:
@@ -167,7 +281,58 @@ def trigger_cancel_timeout_orders():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# 获取超时订单列表的API
+# 数据库耗时统计：按SQL指纹与接口聚合（?top=50&sort=total|count|p95|max）
+@app.route('/api/admin/db-stats', methods=['GET'])
+def get_db_stats():
+    """获取SQL耗时统计与各接口的数据库耗时"""
+    try:
+        top = request.args.get('top', 50, type=int)
+        sort_by = request.args.get('sort', 'total')
+        stats = db_manager.stats.snapshot(top=top, sort_by=sort_by)
+        stats['pool'] = db_manager.pool_stats()
+        stats['slow_query_ms'] = db_manager.stats.slow_query_ms
+        stats['cache'] = {
+            'count': count_cache.stats(),
+            'listing': listing_cache.stats(),
+            'item_detail': item_detail_cache.stats()
+        }
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/admin/db-stats/reset', methods=['POST'])
+def reset_db_stats():
+    """清空SQL耗时统计"""
+    db_manager.stats.reset()
+    return jsonify({'message': 'Database statistics reset'})
+
+def _stream_csv(sql, params):
+    """将查询结果逐行编码为CSV（record 行即元组，可直接写入）"""
+    buffer = io.StringIO()
+    writer = None
+    for row in db_manager.execute_stream(sql, params, result='record'):
+        if writer is None:
+            writer = csv.writer(buffer)
+            writer.writerow(row._fields)
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+# 手动触发收藏数校准的API
+@app.route('/api/admin/reconcile-wishlist-counts', methods=['POST'])
+def trigger_reconcile_wishlist_counts():
+    """手动触发商品收藏数校准"""
+    try:
+        fixed = reconcile_wishlist_counts()
+        return jsonify({
+            'message': f'已修正 {fixed} 个商品的收藏数',
+            'fixed_count': fixed
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 获取超时订单列表的API（?format=csv 以流式CSV导出）
 @app.route('/api/admin/timeout-orders', methods=['GET'])
 def get_timeout_orders():
     """获取超时未支付的订单列表"""
@@ -193,6 +358,12 @@ def get_timeout_orders():
         WHERE o.order_status = 'pending_payment'
           AND TIMESTAMPDIFF(MINUTE, o.create_time, NOW()) > %s
         """
+
+        # 导出模式：服务端游标逐行输出CSV，内存占用不随订单数增长
+        if request.args.get('format') == 'csv':
+            return Response(_stream_csv(sql, (timeout_minutes,)), mimetype='text/csv',
+                            headers={'Content-Disposition': 'attachment; filename=timeout_orders.csv'})
+
         orders = db_manager.execute_query(sql, (timeout_minutes,))
         return jsonify({
             'timeout_orders': orders,
@@ -214,9 +385,14 @@ if __name__ == '__main__':
     print(f"超时检查间隔: {CHECK_INTERVAL_SECONDS} 秒 ({CHECK_INTERVAL_SECONDS // 60} 分钟)")
     print("=" * 50)
 
-    # 启动后台超时订单检查线程
-    timeout_thread = threading.Thread(target=order_timeout_checker, daemon=True)
-    timeout_thread.start()
-    print("[订单超时] 后台检查任务已启动")
+    # 预热数据库连接池
+    try:
+        db_manager.pool.prefill()
+        print(f"[连接池] 已预建 {db_manager.pool.min_size} 个连接 (最大 {db_manager.pool.max_size})")
+    except Exception as e:
+        print(f"[连接池] 预建连接失败: {e}")
+
+    # 启动后台超时订单检查、收藏数校准线程
+    start_background_jobs()
 
     app.run(debug=True, host='0.0.0.0', port=5001)
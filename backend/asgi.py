@@ -0,0 +1,180 @@
+"""ASGI 入口：热点只读接口由异步数据访问层处理，其余请求转交 Flask 应用
+
+启动（在 backend 目录下）: uvicorn asgi:application --host 0.0.0.0 --port 5001
+"""
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from urllib.parse import parse_qsl
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import http_date, quote_etag
+
+sys.path.append(os.path.dirname(__file__))
+
+from app import app as flask_app, CustomJSONEncoder, CORS_ORIGINS, start_background_jobs
+from async_db import AsyncDatabaseManager, current_endpoint
+from conditional import body_etag, etag_matches, source_etag
+from db import db_manager
+from query_plan import run_plan_async
+from routes.item_routes import (
+    list_items_plan, search_items_plan, item_detail_plan, batch_items_plan, item_detail_validators
+)
+from routes.message_routes import conversations_plan, unread_count_plan
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    """把 WSGI 应用包装为 ASGI 应用，WSGI 调用在大小固定的线程池中并发执行
+
+    asgiref 自带的 WsgiToAsgi 以 thread_sensitive 方式运行，所有 WSGI 调用都排队进入同一个
+    单线程执行器；这里改用独立线程池，效果与多线程 WSGI 服务器相同。
+    """
+
+    def __init__(self, wsgi_application, max_workers):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        await _ThreadPoolWsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+
+class _ThreadPoolWsgiInstance(WsgiToAsgiInstance):
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        run = partial(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, self)
+        await sync_to_async(run, thread_sensitive=False, executor=self.executor)(body)
+
+
+async_db = AsyncDatabaseManager(db_manager)
+# 非热点接口（下单、上传、导出等）交给 Flask；线程数默认与主库连接池上限一致
+wsgi_app = ThreadPoolWsgiToAsgi(
+    flask_app,
+    max_workers=db_manager.config.getint('asgi', 'wsgi_threads', fallback=db_manager.pool.max_size)
+)
+
+
+def _content_etag(body):
+    """按响应内容生成强 ETag，无 Last-Modified"""
+    return None, None
+
+
+# (路径, 端点名, 根据路径参数/查询参数/host_url 生成查询流程, 条件请求方式)，与 Flask 中的同名视图一一对应
+# 条件请求方式：None 表示不加 ETag；否则为 body -> (etag_source, last_modified)，
+# 与 Flask 视图传给 conditional_json 的参数一致（etag_source 为 None 时按响应内容生成强 ETag）
+ASYNC_ROUTES = [
+    (re.compile(r'^/api/items/$'), 'item.get_items',
+     lambda match, args, host_url: list_items_plan(args, host_url), _content_etag),
+    (re.compile(r'^/api/items/search$'), 'item.search_items',
+     lambda match, args, host_url: search_items_plan(args, host_url), _content_etag),
+    (re.compile(r'^/api/items/batch$'), 'item.get_items_batch',
+     lambda match, args, host_url: batch_items_plan(args, host_url), _content_etag),
+    (re.compile(r'^/api/items/(\d+)$'), 'item.get_item',
+     lambda match, args, host_url: item_detail_plan(int(match.group(1)), host_url), item_detail_validators),
+    (re.compile(r'^/api/messages/conversations/(\d+)$'), 'message.get_conversations',
+     lambda match, args, host_url: conversations_plan(int(match.group(1)), host_url), None),
+    (re.compile(r'^/api/messages/unread/(\d+)$'), 'message.get_unread_count',
+     lambda match, args, host_url: unread_count_plan(int(match.group(1))), None),
+]
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _dumps(body):
+    return json.dumps(body, cls=CustomJSONEncoder, ensure_ascii=False).encode('utf-8')
+
+
+async def _send_json(send, scope, body, status, validators=None):
+    """发送 JSON 响应；validators 不为空时加 ETag / Last-Modified，
+    If-None-Match 命中则返回 304（与 conditional.conditional_json 相同的规则）"""
+    payload = None
+    headers = []
+    if status == 200 and validators is not None:
+        etag_source, last_modified = validators(body)
+        if etag_source is None:
+            payload = _dumps(body)
+            etag = body_etag(payload)
+            headers.append((b'etag', quote_etag(etag).encode('latin-1')))
+        else:
+            # 弱 ETag 只依赖 etag_source，命中时不必序列化响应体
+            etag = source_etag(etag_source)
+            headers.append((b'etag', quote_etag(etag, weak=True).encode('latin-1')))
+        if last_modified:
+            headers.append((b'last-modified', http_date(last_modified).encode('latin-1')))
+        headers.append((b'cache-control', b'no-cache'))
+        if etag_matches(_header(scope, b'if-none-match'), etag):
+            status, payload = 304, b''
+
+    if payload is None:
+        payload = _dumps(body)
+    if status != 304:
+        headers += [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode('latin-1')),
+        ]
+    origin = _header(scope, b'origin')
+    if origin in CORS_ORIGINS:
+        headers += [
+            (b'access-control-allow-origin', origin.encode('latin-1')),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin'),
+        ]
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def _handle(scope, send, endpoint, match, make_plan, validators):
+    args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+    host_url = f"{scope.get('scheme', 'http')}://{_header(scope, b'host') or 'localhost'}/"
+    token = current_endpoint.set(endpoint)
+    try:
+        body, status = await run_plan_async(make_plan(match, args, host_url), async_db)
+    except Exception as e:
+        body, status = {'error': str(e)}, 500
+    finally:
+        current_endpoint.reset(token)
+    await _send_json(send, scope, body, status, validators)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await async_db.start()
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            start_background_jobs()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_db.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+
+    if scope['type'] == 'http' and scope['method'] == 'GET':
+        for pattern, endpoint, make_plan, validators in ASYNC_ROUTES:
+            match = pattern.match(scope['path'])
+            if match:
+                await _handle(scope, send, endpoint, match, make_plan, validators)
+                return
+
+    await wsgi_app(scope, receive, send)
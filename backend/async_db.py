@@ -0,0 +1,109 @@
+import asyncio
+import contextvars
+import time
+
+import aiomysql
+
+from db import check_result_mode, shape_rows
+
+# 当前异步请求的端点名，用于SQL耗时统计
+current_endpoint = contextvars.ContextVar('current_endpoint', default='asgi')
+
+
+class AsyncDatabaseManager:
+    """基于 aiomysql 的异步数据访问层
+
+    连接参数、共享的 SSLContext 与连接池大小沿用同步的 DatabaseManager，SQL 耗时也记录到同一个
+    QueryStats 中。只读副本目前只由同步路径使用，异步查询全部走主库。
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.pool = None
+
+    async def start(self):
+        manager = self.manager
+        self.pool = await aiomysql.create_pool(
+            host=manager.host,
+            port=manager.port,
+            user=manager.username,
+            password=manager.password,
+            db=manager.database,
+            ssl=manager.ssl_context,
+            charset='utf8mb4',
+            cursorclass=aiomysql.DictCursor,
+            autocommit=True,
+            minsize=manager.pool.min_size,
+            maxsize=manager.pool.max_size,
+            pool_recycle=int(manager.pool.max_lifetime)
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def _execute(self, sql, params, result='dict'):
+        conn = await asyncio.wait_for(self.pool.acquire(), self.manager.pool.borrow_timeout)
+        try:
+            cursor_class = aiomysql.DictCursor if result == 'dict' else aiomysql.Cursor
+            async with conn.cursor(cursor_class) as cursor:
+                start = time.perf_counter()
+                try:
+                    await cursor.execute(sql, params)
+                finally:
+                    self.manager.stats.record(sql, time.perf_counter() - start,
+                                              endpoint=current_endpoint.get())
+                rows = await cursor.fetchall()
+                if result == 'dict':
+                    return list(rows)
+                columns = tuple(column[0] for column in cursor.description or ())
+                return shape_rows(columns, rows, result)
+        finally:
+            self.pool.release(conn)
+
+    async def execute_query(self, sql, params=None, use_primary=False, result='dict'):
+        """执行查询语句（result 同 DatabaseManager.execute_query）"""
+        check_result_mode(result)
+        return await self._execute(sql, params, result=result)
+
+    async def execute_batch(self, statements, use_primary=False, result='dict'):
+        """一次往返执行多条读语句（同 DatabaseManager.execute_batch）
+
+        aiomysql 0.1.1 建立连接时总是带上 CLIENT.MULTI_STATEMENTS，无法关闭；
+        这里仍按 multi_statements 配置决定是否拼接多语句。
+        """
+        check_result_mode(result)
+        statements = [(sql, params) for sql, params in statements]
+        if not statements:
+            return []
+        if not self.manager.multi_statements or len(statements) == 1:
+            return [await self.execute_query(sql, params, result=result) for sql, params in statements]
+
+        conn = await asyncio.wait_for(self.pool.acquire(), self.manager.pool.borrow_timeout)
+        try:
+            cursor_class = aiomysql.DictCursor if result == 'dict' else aiomysql.Cursor
+            async with conn.cursor(cursor_class) as cursor:
+                batch_sql = ';\n'.join(cursor.mogrify(sql.strip().rstrip(';'), params)
+                                        for sql, params in statements)
+                stats_sql = ';\n'.join(sql.strip().rstrip(';') for sql, _ in statements)
+                start = time.perf_counter()
+                try:
+                    await cursor.execute(batch_sql)
+                finally:
+                    self.manager.stats.record(stats_sql, time.perf_counter() - start,
+                                              endpoint=current_endpoint.get())
+                results = []
+                while True:
+                    rows = await cursor.fetchall()
+                    if result == 'dict':
+                        results.append(list(rows))
+                    else:
+                        columns = tuple(column[0] for column in cursor.description or ())
+                        results.append(shape_rows(columns, rows, result))
+                    if not await cursor.nextset():
+                        break
+                return results
+        finally:
+            self.pool.release(conn)
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+from db import db_manager
+
+_MISSING = object()
+
+
+class TaggedCache:
+    """带过期时间和标签失效的进程内缓存（LRU 淘汰）
+
+    每个标签有一个版本号，写入条目时记录其标签的版本（stamp）；invalidate(tag) 只递增
+    版本号，旧条目在读取时判定失效。先取 stamp 再查询数据库，可以避免把失效期间
+    查到的旧值写进缓存。
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def stamp(self, tags):
+        """当前各标签的版本号，传给 set()"""
+        with self._lock:
+            return tuple((tag, self._versions.get(tag, 0)) for tag in tags)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value, stamp = entry
+                if expires_at > time.monotonic() and all(self._versions.get(tag, 0) == version
+                                                         for tag, version in stamp):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, stamp=(), ttl=None):
+        with self._lock:
+            if any(self._versions.get(tag, 0) != version for tag, version in stamp):
+                return
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), value, stamp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *tags):
+        """使带有任一标签的条目失效（相关表写入后调用）"""
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# 分页总数缓存：键为 (列表名, WHERE 条件, 参数)，标签为计数依赖的表名
+count_cache = TaggedCache(
+    ttl=db_manager.config.getfloat('cache', 'count_ttl', fallback=30),
+    max_entries=db_manager.config.getint('cache', 'count_max_entries', fallback=10000)
+)
+
+# 商品列表响应缓存：前几页列表对所有访问者相同，键为规范化后的查询参数，标签为 'item'
+listing_cache = TaggedCache(
+    ttl=db_manager.config.getfloat('cache', 'listing_ttl', fallback=10),
+    max_entries=db_manager.config.getint('cache', 'listing_max_entries', fallback=2000)
+)
+# 只缓存前 listing_cache_pages 页（游标翻页不缓存）
+LISTING_CACHE_PAGES = db_manager.config.getint('cache', 'listing_cache_pages', fallback=5)
+
+# 商品详情文档缓存：键为 (item_id, host_url)，标签为 item:<商品ID> 与 user:<卖家ID>
+# 浏览次数不在缓存内失效，由 view_counter 的累计计数叠加在缓存值之上
+item_detail_cache = TaggedCache(
+    ttl=db_manager.config.getfloat('cache', 'detail_ttl', fallback=300),
+    max_entries=db_manager.config.getint('cache', 'detail_max_entries', fallback=5000)
+)
+
+# count 参数：approx（默认）优先使用缓存的总数；exact 总是执行 COUNT(*)；none 不查总数，只返回 has_more
+COUNT_MODES = ('none', 'approx', 'exact')
+
+
+def get_count_mode(args):
+    mode = args.get('count', 'approx')
+    return mode if mode in COUNT_MODES else 'approx'
+
+
+def pagination(page, limit, total, has_more):
+    """分页信息（count=none 时 total/pages 为 None）"""
+    return {
+        'page': page,
+        'limit': limit,
+        'total': total,
+        'pages': (total + limit - 1) // limit if total is not None else None,
+        'has_more': has_more
+    }
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from db import db_manager
+
+
+class CategoryTreeCache:
+    """分类树缓存（含各分类在售商品数 item_count）
+
+    分类几乎不变化：组装好的分类树常驻内存，商品上架/下架/售出/恢复在售时由接口按分类
+    增减 item_count；每 refresh_interval 秒从数据库完整重建一次，纠正计数偏差。
+    """
+
+    def __init__(self, db, refresh_interval=600):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self._tree = None
+        self._nodes = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def get_tree(self):
+        """返回分类树（过期时重建）"""
+        tree = self._tree
+        if tree is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+            with self._load_lock:
+                tree = self._tree
+                if tree is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+                    tree = self._load()
+        return tree
+
+    def adjust(self, category_id, delta):
+        """在售商品数变化时增减对应分类的 item_count（缓存未加载时忽略）"""
+        with self._lock:
+            node = self._nodes.get(category_id)
+            if node is not None:
+                node['item_count'] = max(0, node['item_count'] + delta)
+
+    def invalidate(self):
+        """丢弃缓存，下次读取时重建（分类本身增删改后调用）"""
+        with self._lock:
+            self._tree = None
+            self._nodes = {}
+
+    def _load(self):
+        sql = """
+        SELECT c.category_id, c.category_name, c.parent_category_id, c.description,
+               COUNT(i.item_id) as item_count
+        FROM category c
+        LEFT JOIN item i ON c.category_id = i.category_id AND i.status = 'available'
+        GROUP BY c.category_id, c.category_name, c.parent_category_id, c.description
+        ORDER BY c.sort_order, c.category_name
+        """
+
+        # 计数在缓存期内只做增量调整，从主库读取，避免以副本上的旧数据为基准
+        categories = self.db.execute_query(sql, use_primary=True)
+
+        # 构建分类树
+        category_tree = []
+        category_map = {}
+
+        # 先创建所有分类的映射
+        for cat in categories:
+            category_map[cat['category_id']] = {
+                'category_id': cat['category_id'],
+                'category_name': cat['category_name'],
+                'description': cat['description'],
+                'item_count': cat['item_count'],
+                'children': []
+            }
+
+        # 构建树结构
+        for cat in categories:
+            if cat['parent_category_id'] is None:
+                category_tree.append(category_map[cat['category_id']])
+            else:
+                parent = category_map.get(cat['parent_category_id'])
+                if parent:
+                    parent['children'].append(category_map[cat['category_id']])
+
+        with self._lock:
+            self._tree = category_tree
+            self._nodes = category_map
+            self._loaded_at = time.monotonic()
+        return category_tree
+
+
+category_tree = CategoryTreeCache(
+    db_manager,
+    refresh_interval=db_manager.config.getfloat('cache', 'category_tree_ttl', fallback=600)
+)
@@ -0,0 +1,47 @@
+import hashlib
+import json
+
+from flask import Response, jsonify, request
+from werkzeug.http import parse_etags
+
+
+def body_etag(payload):
+    """响应内容（bytes）的哈希，用作强 ETag"""
+    return hashlib.sha1(payload).hexdigest()
+
+
+def source_etag(etag_source):
+    """etag_source 的哈希，用作弱 ETag（不需要先序列化整个响应体）"""
+    payload = json.dumps(etag_source, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match 请求头（原始字符串）是否包含 etag（弱比较）"""
+    return parse_etags(if_none_match).contains_weak(etag)
+
+
+def conditional_json(body, status=200, last_modified=None, etag_source=None):
+    """JSON 响应加 ETag / Last-Modified，客户端缓存仍有效时返回 304（不带响应体）
+
+    默认 ETag 为响应内容的哈希（强 ETag）；响应中含有不影响缓存有效性的易变字段
+    （如详情页的浏览次数）时，由 etag_source 指定参与哈希的数据，生成弱 ETag，
+    并在序列化响应体之前比较 If-None-Match。
+    """
+    if status != 200:
+        return jsonify(body), status
+
+    if etag_source is None:
+        response = jsonify(body)
+        response.set_etag(body_etag(response.get_data()))
+    else:
+        etag = source_etag(etag_source)
+        response = Response(status=304) if request.if_none_match.contains_weak(etag) else jsonify(body)
+        response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    # 允许客户端缓存，但每次使用前都要携带 If-None-Match 重新验证
+    response.cache_control.no_cache = True
+    if response.status_code == 304:
+        return response
+    return response.make_conditional(request)
@@ -1,78 +1,684 @@
 import pymysql
 import os
 import configparser
+import ssl
+import threading
+import time
+from collections import namedtuple
 from contextlib import contextmanager
+from functools import lru_cache
 import hashlib
+import itertools
 import uuid
 from datetime import datetime
+from flask import g, has_request_context
+from query_stats import QueryStats
+
+
+def chunked(seq, size):
+    """把序列按 size 切分成若干列表"""
+    seq = list(seq)
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+# 查询结果形式：dict 为默认的字典行；tuple 为元组行；record 为按列名生成的 namedtuple 行；
+# columns 为列式结果 {'columns': [列名...], 'values': [[第1列的值...], [第2列的值...], ...]}
+RESULT_MODES = ('dict', 'tuple', 'record', 'columns')
+
+
+@lru_cache(maxsize=256)
+def record_type(columns):
+    """按列名元组生成（并缓存）namedtuple 行类型；非法标识符的列名自动改名为 _0、_1 ..."""
+    return namedtuple('Record', columns, rename=True)
+
+
+def check_result_mode(result):
+    if result not in RESULT_MODES:
+        raise ValueError(f"不支持的结果形式: {result}")
+
+
+def shape_rows(columns, rows, result):
+    """把元组行转换为指定的结果形式（columns 为列名元组）"""
+    if result == 'record':
+        make = record_type(columns)._make
+        return [make(row) for row in rows]
+    if result == 'columns':
+        values = [list(column) for column in zip(*rows)] if rows else [[] for _ in columns]
+        return {'columns': list(columns), 'values': values}
+    return list(rows)
+
+
+class ResumableSSLContext(ssl.SSLContext):
+    """进程内共享的 SSLContext，按服务器缓存 TLS 会话
+
+    新连接握手时带上该服务器最近一次的会话（TLS 会话票据），服务端支持时只做简化握手，
+    省去证书链传输与校验；CA 证书只在创建上下文时读取一次。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.handshakes = 0
+        self.resumed = 0
+
+    def wrap_socket(self, sock, *args, **kwargs):
+        hostname = kwargs.get('server_hostname')
+        if kwargs.get('session') is None:
+            with self._lock:
+                kwargs['session'] = self._sessions.get(hostname)
+        return super().wrap_socket(sock, *args, **kwargs)
+
+    def remember(self, hostname, ssl_sock):
+        """握手及认证完成后记录会话，供下一次连接恢复"""
+        with self._lock:
+            self.handshakes += 1
+            if ssl_sock.session_reused:
+                self.resumed += 1
+            if ssl_sock.session is not None:
+                self._sessions[hostname] = ssl_sock.session
+
+    def stats(self):
+        with self._lock:
+            return {'handshakes': self.handshakes, 'resumed': self.resumed}
+
+
+def create_ssl_context(ca_file, check_hostname):
+    """创建校验服务器证书的共享 SSLContext"""
+    context = ResumableSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = check_hostname
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.load_verify_locations(cafile=ca_file)
+    return context
+
+
+class PoolTimeoutError(Exception):
+    """在借用超时时间内没有可用连接"""
+
+
+class PooledConnection:
+    """连接池中的连接及其生命周期信息"""
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """有界、带健康检查的数据库连接池
+
+    - min_size: 空闲回收时至少保留的连接数
+    - max_size: 同时存在的最大连接数（含借出的）
+    - idle_timeout: 空闲超过该秒数的连接（超出 min_size 部分）被关闭
+    - max_lifetime: 连接存活超过该秒数后不再复用
+    - ping_on_borrow / ping_interval: 借出前对空闲超过 ping_interval 秒的连接执行 ping
+    - borrow_timeout: 连接耗尽时等待的最长秒数，超时抛出 PoolTimeoutError
+    """
+
+    def __init__(self, creator, min_size=1, max_size=10, idle_timeout=300,
+                 max_lifetime=3600, ping_on_borrow=True, ping_interval=5,
+                 borrow_timeout=10):
+        self._creator = creator
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.ping_on_borrow = ping_on_borrow
+        self.ping_interval = ping_interval
+        self.borrow_timeout = borrow_timeout
+
+        self._idle = []  # 后进先出，最近归还的连接最先被复用
+        self._in_use = {}  # id(conn) -> PooledConnection
+        self._size = 0
+        self._cond = threading.Condition(threading.Lock())
+
+    def prefill(self):
+        """预先建立 min_size 个连接"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = PooledConnection(self._creator())
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def acquire(self):
+        """借出一个可用连接"""
+        deadline = time.monotonic() + self.borrow_timeout
+        while True:
+            pooled = None
+            with self._cond:
+                self._reap_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(
+                            f'No database connection available within {self.borrow_timeout}s '
+                            f'(max_size={self.max_size})')
+                    self._cond.wait(remaining)
+                    self._reap_idle()
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if pooled is None:
+                try:
+                    pooled = PooledConnection(self._creator())
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(pooled):
+                self._close(pooled)
+                continue
+
+            with self._cond:
+                self._in_use[id(pooled.conn)] = pooled
+            return pooled.conn
+
+    def release(self, conn):
+        """归还连接；已断开或超过最大存活时间的连接直接关闭"""
+        with self._cond:
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is None:
+            return
+        now = time.monotonic()
+        if not conn.open or now - pooled.created_at >= self.max_lifetime:
+            self._close(pooled)
+            return
+        pooled.last_used = now
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def discard(self, conn):
+        """丢弃一个借出的连接（例如出现网络错误之后）"""
+        with self._cond:
+            pooled = self._in_use.pop(id(conn), None)
+        if pooled is not None:
+            self._close(pooled)
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'max_size': self.max_size
+            }
+
+    def _is_healthy(self, pooled):
+        now = time.monotonic()
+        if now - pooled.created_at >= self.max_lifetime:
+            return False
+        if not pooled.conn.open:
+            return False
+        if self.ping_on_borrow and now - pooled.last_used >= self.ping_interval:
+            try:
+                pooled.conn.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _reap_idle(self):
+        """关闭超出 min_size 且空闲超时的连接（调用方需持有锁）"""
+        now = time.monotonic()
+        # _idle 按归还时间排序，最久未用的在前
+        while len(self._idle) > 0 and self._size > self.min_size:
+            oldest = self._idle[0]
+            if now - oldest.last_used < self.idle_timeout:
+                break
+            self._idle.pop(0)
+            self._size -= 1
+            self._cond.notify()
+            try:
+                oldest.conn.close()
+            except Exception:
+                pass
+
+    def _close(self, pooled):
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+
+class Replica:
+    """只读副本：独立的连接池及最近一次探测到的健康状态与复制延迟"""
+    __slots__ = ('name', 'pool', 'healthy', 'lag', 'checked_at', 'lock')
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = True
+        self.lag = None  # 秒；None 表示未知（无权限查看复制状态等）
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def mark_down(self):
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
 
 class DatabaseManager:
     def __init__(self):
         self.config = configparser.ConfigParser()
         config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini')
         self.config.read(config_path, encoding='utf-8')
-        
+
         # 数据库连接参数
         self.host = self.config.get('database', 'host')
         self.port = self.config.getint('database', 'port')
         self.database = self.config.get('database', 'database')
         self.username = self.config.get('database', 'username')
         self.password = self.config.get('database', 'password')
-        
-        # SSL配置
-        self.ssl_config = {
-            'ca': os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                              self.config.get('ssl', 'ca_file')),
-            'check_hostname': self.config.getboolean('ssl', 'check_hostname')
-        }
+
+        # SSL配置：启动时创建一次 SSLContext，所有连接共用（含 TLS 会话恢复）
+        self.ssl_context = create_ssl_context(
+            os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                         self.config.get('ssl', 'ca_file')),
+            self.config.getboolean('ssl', 'check_hostname')
+        )
+
+        # 多语句：开启后 execute_batch 把多条读语句拼成一次往返发送。
+        # 默认关闭：该标志作用于所有池中连接，一旦出现 SQL 注入即可执行堆叠语句
+        self.multi_statements = self.config.getboolean('database', 'multi_statements', fallback=False)
+
+        # 连接池配置（[pool] 段可省略，使用默认值）
+        self.pool = self._create_pool(self.host, self.port)
+
+        # 只读副本：replicas = host1:port1, host2:port2（未配置时所有语句都走主库）
+        self.replicas = []
+        for entry in self.config.get('database', 'replicas', fallback='').split(','):
+            entry = entry.strip()
+            if not entry:
+                continue
+            host, _, port = entry.partition(':')
+            port = int(port) if port else self.port
+            self.replicas.append(Replica(f'{host}:{port}', self._create_pool(host, port)))
+        self.max_replica_lag = self.config.getfloat('replica', 'max_lag_seconds', fallback=5)
+        self.lag_check_interval = self.config.getfloat('replica', 'lag_check_interval', fallback=10)
+        self._replica_cursor = itertools.count()
+
+        # 批量写入时单条语句的最大字节数（需小于服务端 max_allowed_packet）
+        self.max_statement_bytes = self.config.getint('database', 'max_statement_bytes',
+                                                      fallback=1024 * 1024)
+
+        # 语句耗时统计与慢查询日志
+        self.stats = QueryStats(
+            enabled=self.config.getboolean('monitoring', 'enabled', fallback=True),
+            slow_query_ms=self.config.getfloat('monitoring', 'slow_query_ms', fallback=200),
+            sample_size=self.config.getint('monitoring', 'sample_size', fallback=1000)
+        )
+
+        # 当前线程中由 transaction() 绑定的连接
+        self._local = threading.local()
+
+    def _create_pool(self, host, port):
+        return ConnectionPool(
+            lambda: self._connect(host, port),
+            min_size=self.config.getint('pool', 'min_size', fallback=1),
+            max_size=self.config.getint('pool', 'max_size', fallback=10),
+            idle_timeout=self.config.getfloat('pool', 'idle_timeout', fallback=300),
+            max_lifetime=self.config.getfloat('pool', 'max_lifetime', fallback=3600),
+            ping_on_borrow=self.config.getboolean('pool', 'ping_on_borrow', fallback=True),
+            ping_interval=self.config.getfloat('pool', 'ping_interval', fallback=5),
+            borrow_timeout=self.config.getfloat('pool', 'borrow_timeout', fallback=10)
+        )
+
+    def init_app(self, app):
+        """注册请求结束回调：归还请求级连接并累计接口的数据库耗时"""
+        app.teardown_request(self._release_request_connection)
+
+    def _release_request_connection(self, exc=None):
+        self.stats.record_request()
+        for pool, conn in g.pop('db_conns', {}).values():
+            pool.release(conn)
+
+    def _connect(self, host, port):
+        """建立一个新的物理连接（autocommit 模式，避免池中连接残留未结束的事务）"""
+        conn = pymysql.connect(
+            host=host,
+            port=port,
+            user=self.username,
+            password=self.password,
+            database=self.database,
+            ssl=self.ssl_context,
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True,
+            client_flag=pymysql.constants.CLIENT.MULTI_STATEMENTS if self.multi_statements else 0
+        )
+        # TLS 1.3 的会话票据在握手之后才下发，认证完成后再记录会话
+        sock = getattr(conn, '_sock', None)
+        if isinstance(sock, ssl.SSLSocket):
+            self.ssl_context.remember(host, sock)
+        return conn
+
+    def _check_replica(self, replica):
+        """探测副本的复制延迟（后台线程中执行，调用方已持有 replica.lock）"""
+        try:
+            conn = replica.pool.acquire()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SHOW SLAVE STATUS")
+                    row = cursor.fetchone()
+                replica.pool.release(conn)
+            except pymysql.err.OperationalError:
+                replica.pool.discard(conn)
+                raise
+            except pymysql.MySQLError:
+                # 没有查看复制状态的权限：延迟未知，仍视为可用
+                replica.pool.release(conn)
+                row = None
+            replica.lag = row.get('Seconds_Behind_Master') if row else None
+            replica.healthy = not row or replica.lag is not None
+        except Exception:
+            replica.healthy = False
+        finally:
+            replica.lock.release()
+
+    def _choose_replica(self):
+        """轮询选择一个健康且延迟不超过 max_lag_seconds 的副本，没有则返回 None
+
+        到期的延迟探测交给后台线程（每个副本同一时刻只有一个），请求线程沿用上次结果，
+        不会因为副本连接池耗尽而等待。
+        """
+        now = time.monotonic()
+        candidates = []
+        for replica in self.replicas:
+            if now - replica.checked_at >= self.lag_check_interval and replica.lock.acquire(False):
+                replica.checked_at = now
+                threading.Thread(target=self._check_replica, args=(replica,),
+                                 name=f'replica-check-{replica.name}', daemon=True).start()
+            if replica.healthy and (replica.lag is None or replica.lag <= self.max_replica_lag):
+                candidates.append(replica)
+        if not candidates:
+            return None
+        return candidates[next(self._replica_cursor) % len(candidates)]
+
+    def _acquire(self, readonly):
+        """借出连接，返回 (pool, conn)；只读语句优先使用副本，副本不可用时回退主库"""
+        if readonly and self.replicas:
+            replica = self._choose_replica()
+            if replica is not None:
+                try:
+                    return replica.pool, replica.pool.acquire()
+                except Exception:
+                    replica.mark_down()
+        return self.pool, self.pool.acquire()
+
+    def _request_connection(self, conns, readonly):
+        """请求级连接，按来源连接池绑定在 conns（flask.g.db_conns）中，返回 (pool, conn)
+
+        读语句选定的连接池记在 g.db_read_pool；没有可用副本时回退主库，
+        与本请求的写语句共用同一个主库连接，一个请求最多占用主库的一个连接。
+        """
+        if readonly:
+            pool = g.get('db_read_pool')
+            if pool is None or pool not in conns:
+                replica = self._choose_replica() if self.replicas else None
+                pool = replica.pool if replica is not None else self.pool
+                if pool not in conns and replica is not None:
+                    try:
+                        conns[pool] = (pool, pool.acquire())
+                    except Exception:
+                        replica.mark_down()
+                        pool = self.pool
+                g.db_read_pool = pool
+        else:
+            pool = self.pool
+        if pool not in conns:
+            conns[pool] = (pool, pool.acquire())
+        return conns[pool]
+
+    def _mark_write(self):
+        """记录本请求已写过主库，之后的读取都走主库（读己之写）"""
+        if has_request_context():
+            g.db_wrote = True
 
     @contextmanager
-    def get_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
+    def get_connection(self, readonly=False):
+        """获取数据库连接的上下文管理器
+
+        - 事务块内：复用 transaction() 绑定的主库连接
+        - 请求上下文中：每个连接池（主库/副本）首次使用时借出并绑定到 flask.g，请求结束时归还；
+          读语句回退主库时复用本请求的主库连接
+        - 其他情况（后台线程等）：按次借出、用完归还
+        - readonly=True 时使用副本，但本请求已写过主库时仍走主库
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+
+        if has_request_context():
+            conns = g.setdefault('db_conns', {})
+            pool, conn = self._request_connection(conns, readonly and not g.get('db_wrote'))
+            try:
+                yield conn
+            except pymysql.err.OperationalError:
+                # 请求级连接已不可用，丢弃后本请求的后续语句会重新借出
+                conns.pop(pool, None)
+                pool.discard(conn)
+                raise
+            return
+
+        pool, conn = self._acquire(readonly)
         try:
-            conn = pymysql.connect(
-                host=self.host,
-                port=self.port,
-                user=self.username,
-                password=self.password,
-                database=self.database,
-                ssl=self.ssl_config,
-                charset='utf8mb4',
-                cursorclass=pymysql.cursors.DictCursor
-            )
             yield conn
-        except Exception as e:
-            if conn:
+        except pymysql.err.OperationalError:
+            # 网络/服务端错误后连接状态不可信，不放回池中
+            pool.discard(conn)
+            conn = None
+            raise
+        except Exception:
+            if conn.open:
                 conn.rollback()
-            raise e
+            raise
         finally:
-            if conn:
-                conn.close()
+            if conn is not None:
+                pool.release(conn)
 
-    def execute_query(self, sql, params=None):
-        """执行查询语句"""
+    @contextmanager
+    def transaction(self):
+        """工作单元：块内的 execute_* 共用同一连接，正常结束时一次提交，异常时回滚
+
+        嵌套使用时并入最外层事务。
+        """
+        outer = getattr(self._local, 'conn', None)
+        if outer is not None:
+            yield outer
+            return
+        self._mark_write()
         with self.get_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(sql, params)
-                return cursor.fetchall()
+            conn.begin()
+            self._local.conn = conn
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                if conn.open:
+                    conn.rollback()
+                raise
+            finally:
+                self._local.conn = None
+
+    def pool_stats(self):
+        """主库及各副本连接池的状态"""
+        return {
+            'tls': self.ssl_context.stats(),
+            'primary': self.pool.stats(),
+            'replicas': [
+                dict(replica.pool.stats(), name=replica.name, healthy=replica.healthy, lag=replica.lag)
+                for replica in self.replicas
+            ]
+        }
+
+    def in_transaction(self):
+        return getattr(self._local, 'conn', None) is not None
+
+    def _execute(self, cursor, sql, params=None, stats_sql=None):
+        """执行语句并记录耗时（stats_sql 用于替代过长的语句文本参与统计）"""
+        start = time.perf_counter()
+        try:
+            return cursor.execute(sql, params)
+        finally:
+            self.stats.record(stats_sql or sql, time.perf_counter() - start)
+
+    def execute_query(self, sql, params=None, use_primary=False, result='dict'):
+        """执行查询语句（默认走只读副本；需要读到刚写入数据时传 use_primary=True）
+
+        result 指定结果形式（见 RESULT_MODES）：非 dict 形式用元组游标读取，不为每行构造字典。
+        """
+        check_result_mode(result)
+        with self.get_connection(readonly=not use_primary) as conn:
+            if result == 'dict':
+                with conn.cursor() as cursor:
+                    self._execute(cursor, sql, params)
+                    return cursor.fetchall()
+            with conn.cursor(pymysql.cursors.Cursor) as cursor:
+                self._execute(cursor, sql, params)
+                rows = cursor.fetchall()
+                columns = tuple(column[0] for column in cursor.description or ())
+                return shape_rows(columns, rows, result)
+
+    def execute_batch(self, statements, use_primary=False, result='dict'):
+        """一次往返执行多条相互独立的读语句，按顺序返回各语句的结果
+
+        statements 为 [(sql, params), ...]。开启 multi_statements 时各语句参数先在客户端转义，
+        再以分号拼接成一条多语句发送，随后用 nextset() 依次读取每个结果集；
+        未开启时退化为在同一连接上逐条执行。
+        """
+        check_result_mode(result)
+        statements = [(sql, params) for sql, params in statements]
+        if not statements:
+            return []
+        cursor_class = pymysql.cursors.DictCursor if result == 'dict' else pymysql.cursors.Cursor
+
+        def fetch(cursor):
+            rows = cursor.fetchall()
+            if result == 'dict':
+                return rows
+            columns = tuple(column[0] for column in cursor.description or ())
+            return shape_rows(columns, rows, result)
+
+        results = []
+        with self.get_connection(readonly=not use_primary) as conn:
+            with conn.cursor(cursor_class) as cursor:
+                if not self.multi_statements or len(statements) == 1:
+                    for sql, params in statements:
+                        self._execute(cursor, sql, params)
+                        results.append(fetch(cursor))
+                    return results
+
+                batch_sql = ';\n'.join(cursor.mogrify(sql.strip().rstrip(';'), params)
+                                        for sql, params in statements)
+                stats_sql = ';\n'.join(sql.strip().rstrip(';') for sql, _ in statements)
+                self._execute(cursor, batch_sql, stats_sql=stats_sql)
+                results.append(fetch(cursor))
+                while cursor.nextset():
+                    results.append(fetch(cursor))
+        if len(results) != len(statements):
+            raise pymysql.err.ProgrammingError(
+                f"多语句返回 {len(results)} 个结果集，预期 {len(statements)} 个")
+        return results
 
     def execute_update(self, sql, params=None):
         """执行更新语句"""
+        self._mark_write()
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(sql, params)
-                conn.commit()
+                self._execute(cursor, sql, params)
                 return cursor.rowcount
 
     def execute_insert(self, sql, params=None):
         """执行插入语句并返回插入的ID"""
+        self._mark_write()
         with self.get_connection() as conn:
             with conn.cursor() as cursor:
-                cursor.execute(sql, params)
-                conn.commit()
+                self._execute(cursor, sql, params)
                 return cursor.lastrowid
 
+    def execute_many(self, sql, seq_params):
+        """批量执行同一语句并返回影响的总行数
+
+        对 INSERT ... VALUES 语句，pymysql 会自动改写为多行 INSERT，按 max_statement_bytes
+        分块，每块一次往返；其他语句在同一连接上逐条执行。
+        """
+        seq_params = list(seq_params)
+        if not seq_params:
+            return 0
+        self._mark_write()
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.max_stmt_length = self.max_statement_bytes
+                start = time.perf_counter()
+                try:
+                    return cursor.executemany(sql, seq_params)
+                finally:
+                    self.stats.record(sql, time.perf_counter() - start)
+
+    def execute_stream(self, sql, params=None, batch_size=1000, use_primary=False, result='dict'):
+        """流式查询：基于服务端游标（SSDictCursor）逐批读取行，内存占用与结果集大小无关
+
+        使用单独借出的连接（结果读完前该连接不能执行其他语句），不占用请求级/事务连接。
+        调用方提前停止迭代时直接丢弃该连接，避免把剩余结果读完。
+        result 支持 dict/tuple/record（逐行产出，不支持列式）。
+        """
+        if result not in ('dict', 'tuple', 'record'):
+            raise ValueError(f"流式查询不支持的结果形式: {result}")
+        pool, conn = self._acquire(readonly=not use_primary)
+        finished = False
+        try:
+            if result == 'dict':
+                cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            else:
+                cursor = conn.cursor(pymysql.cursors.SSCursor)
+            self._execute(cursor, sql, params)
+            make = None
+            if result == 'record':
+                make = record_type(tuple(column[0] for column in cursor.description))._make
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if make is not None:
+                    rows = map(make, rows)
+                for row in rows:
+                    yield row
+            cursor.close()
+            finished = True
+        finally:
+            if finished:
+                pool.release(conn)
+            else:
+                pool.discard(conn)
+
     @staticmethod
     def hash_password(password):
         """密码加密"""
@@ -84,4 +690,4 @@ class DatabaseManager:
         return str(uuid.uuid4()).replace('-', '')
 
 # 全局数据库管理器实例
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = DatabaseManager()
@@ -0,0 +1,307 @@
+"""商品列表查询引擎：商品浏览与商品搜索共用的过滤、排序与分页
+
+两步查询：先按过滤条件和排序键取一页 item_id（由 (status, category_id, 排序列) 复合索引
+完成范围扫描，ID 与排序键都在索引中），再按 ID 取完整信息并按第一步的顺序重排。
+分页支持 page（OFFSET）与 keyset 游标（cursor），总数按 count 模式读取缓存或与ID查询合并执行。
+"""
+import base64
+import json
+
+from cache import LISTING_CACHE_PAGES, count_cache, get_count_mode, pagination
+from media import parse_json_array, to_public_url, variant_url
+from query_plan import Batch, Query
+
+# 可排序字段（均为 item 表上的列，各有对应的复合索引）
+SORT_FIELDS = ('publish_date', 'price', 'view_count', 'wishlist_count')
+
+# 商品总数依赖的表（写入后通过 count_cache.invalidate 使缓存的总数失效）
+ITEM_COUNT_TAGS = ('item',)
+
+# 商品列表响应缓存依赖的表（商品新增/修改/下架、下单/取消订单后通过 listing_cache.invalidate 失效）
+LISTING_TAGS = ('item',)
+
+# 搜索结果的分面统计：分类、新旧程度、价格区间
+FACET_NAMES = ('category', 'condition', 'price')
+
+# 价格区间的分界（元），最后一个区间不设上限
+PRICE_BUCKETS = (50, 100, 200, 500, 1000, 2000, 5000)
+
+# ngram 全文解析器的分词长度（服务端 ngram_token_size，默认 2），更短的词无法通过全文索引匹配
+NGRAM_TOKEN_SIZE = 2
+
+# 全文检索相关度表达式（BOOLEAN MODE 得分）
+RELEVANCE_SQL = "MATCH(i.title, i.description) AGAINST (%s IN BOOLEAN MODE)"
+
+DETAIL_SQL = """
+SELECT i.item_id, i.title, i.description, i.price, i.original_price,
+       i.condition_level, i.images, i.location, i.publish_date, i.view_count,
+       i.user_id, i.category_id, i.status,
+       u.username, u.avatar, u.credit_score,
+       c.category_name,
+       i.wishlist_count
+FROM item i
+JOIN user u ON i.user_id = u.user_id
+JOIN category c ON i.category_id = c.category_id
+WHERE i.item_id IN ({placeholders})
+"""
+
+
+class ItemFilter:
+    """商品过滤条件（列名统一使用 i. 别名，ID 查询、总数查询与详情查询共用）"""
+    __slots__ = ('conditions', 'params', 'match_query')
+
+    def __init__(self):
+        self.conditions = []
+        self.params = []
+        self.match_query = None
+
+    def add(self, condition, *params):
+        self.conditions.append(condition)
+        self.params.extend(params)
+
+    def keyword(self, keyword):
+        """关键词：走 FULLTEXT 索引（ngram 解析器），过短的关键词回退到 LIKE"""
+        keyword = keyword.strip()
+        if not keyword:
+            return
+        self.match_query = fulltext_query(keyword)
+        if self.match_query:
+            self.add(RELEVANCE_SQL, self.match_query)
+        else:
+            pattern = f"%{keyword}%"
+            self.add("(i.title LIKE %s OR i.description LIKE %s)", pattern, pattern)
+
+    def where(self):
+        return " AND ".join(self.conditions) or "1 = 1"
+
+
+def fulltext_query(keyword):
+    """把搜索关键词转换为 BOOLEAN MODE 查询串：每个词按短语匹配且必须出现
+
+    含短于 NGRAM_TOKEN_SIZE 的词时返回 None，由调用方回退到 LIKE 匹配。
+    """
+    terms = keyword.replace('"', ' ').split()
+    if not terms or any(len(term) < NGRAM_TOKEN_SIZE for term in terms):
+        return None
+    return ' '.join(f'+"{term}"' for term in terms)
+
+
+def encode_cursor(sort_by, sort_order, sort_value, item_id):
+    """把最后一行的排序键和 item_id 编码为不透明的分页游标"""
+    payload = json.dumps([sort_by, sort_order, sort_value, item_id], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """解析分页游标，返回 (排序键, item_id)；游标无效或与当前排序方式不一致时抛出 ValueError"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort_by, cursor_order, sort_value, item_id = json.loads(payload.decode('utf-8'))
+        item_id = int(item_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if cursor_sort_by != sort_by or cursor_order != sort_order:
+        raise ValueError('Cursor does not match sort_by/sort_order')
+    return sort_value, item_id
+
+
+def keyset_condition(sort_expr, sort_order, sort_value, item_id, expr_params=()):
+    """keyset 分页条件：排在游标所指行之后的行（排序键相同时按 item_id 决定先后）
+
+    sort_expr 中含占位符时（如相关度 MATCH ... AGAINST），通过 expr_params 传入其参数。
+    """
+    op = '<' if sort_order == 'DESC' else '>'
+    sql = f"({sort_expr} {op} %s OR ({sort_expr} = %s AND i.item_id {op} %s))"
+    expr_params = list(expr_params)
+    return sql, expr_params + [sort_value] + expr_params + [sort_value, item_id]
+
+
+def listing_cache_key(args, host_url):
+    """商品浏览的响应缓存键：规范化后的查询参数（默认值、大小写、数字格式统一）
+
+    游标翻页或页码超过 LISTING_CACHE_PAGES 时返回 None，不缓存。
+    """
+    page = int(args.get('page', 1))
+    if args.get('cursor') or page > LISTING_CACHE_PAGES:
+        return None
+    sort_by = args.get('sort_by', 'publish_date')
+    if sort_by not in SORT_FIELDS:
+        sort_by = 'publish_date'
+    sort_order = args.get('sort_order', 'DESC').upper()
+    if sort_order not in ('ASC', 'DESC'):
+        sort_order = 'DESC'
+    category_id = args.get('category_id')
+    min_price = args.get('min_price')
+    max_price = args.get('max_price')
+    return (host_url, page, int(args.get('limit', 20)), sort_by, sort_order, get_count_mode(args),
+            args.get('status', 'available'),
+            int(category_id) if category_id else None,
+            float(min_price) if min_price else None,
+            float(max_price) if max_price else None)
+
+
+def count_cache_key(item_filter):
+    """列表总数在 count_cache 中的键"""
+    return ('items', item_filter.where(), tuple(item_filter.params))
+
+
+def get_facets(args):
+    """facets 参数：all 或逗号分隔的分面名（category, condition, price），无效名称忽略"""
+    value = args.get('facets', '')
+    if value == 'all':
+        return FACET_NAMES
+    names = [name.strip() for name in value.split(',')]
+    return tuple(name for name in FACET_NAMES if name in names)
+
+
+def facets_plan(item_filter):
+    """查询流程片段：一条 GROUP BY 查询得到全部分面统计，返回 {分面名: [{..., 'count'}]}
+
+    结果与总数（各组之和）一起写入 count_cache，随后的列表查询在 count=approx 时不再执行 COUNT(*)。
+    """
+    where_clause = item_filter.where()
+    params = tuple(item_filter.params)
+    facets = count_cache.get(('facets', where_clause, params))
+    if facets is not None:
+        return facets
+
+    stamp = count_cache.stamp(ITEM_COUNT_TAGS)
+    bucket_cases = ' '.join(f"WHEN i.price < {bound} THEN {index}" for index, bound in enumerate(PRICE_BUCKETS))
+    sql = f"""
+    SELECT i.category_id, i.condition_level,
+           CASE {bucket_cases} ELSE {len(PRICE_BUCKETS)} END AS price_bucket,
+           COUNT(*) AS cnt
+    FROM item i
+    WHERE {where_clause}
+    GROUP BY i.category_id, i.condition_level, price_bucket
+    """
+    # 结果写入缓存，从主库读取：副本延迟的旧计数一旦缓存，会在整个有效期内被返回
+    rows = yield Query(sql, params, use_primary=True, result='tuple')
+
+    # 按各维度汇总交叉分组的计数
+    categories, conditions, buckets = {}, {}, {}
+    for category_id, condition_level, bucket, cnt in rows:
+        categories[category_id] = categories.get(category_id, 0) + cnt
+        conditions[condition_level] = conditions.get(condition_level, 0) + cnt
+        buckets[bucket] = buckets.get(bucket, 0) + cnt
+    bounds = (0,) + PRICE_BUCKETS + (None,)
+    facets = {
+        'category': [{'category_id': key, 'count': cnt}
+                     for key, cnt in sorted(categories.items(), key=lambda entry: -entry[1])],
+        'condition': [{'condition_level': key, 'count': cnt}
+                      for key, cnt in sorted(conditions.items(), key=lambda entry: -entry[1])],
+        'price': [{'min': bounds[bucket], 'max': bounds[bucket + 1], 'count': buckets[bucket]}
+                  for bucket in sorted(buckets)]
+    }
+    count_cache.set(('facets', where_clause, params), facets, stamp)
+    count_cache.set(count_cache_key(item_filter), sum(categories.values()), stamp)
+    return facets
+
+
+def page_ids_with_total(id_query, count_query, count_key, count_mode):
+    """查询流程片段：取一页ID（元组行），并按 count 模式取总数
+
+    总数缓存命中或 count=none 时只执行ID查询；否则ID查询与 COUNT(*) 合并为一次往返，
+    并把总数写入缓存（count_query 应从主库读取）。返回 (ID行, 总数)，count=none 时总数为 None。
+    """
+    total = count_cache.get(count_key) if count_mode == 'approx' else None
+    if total is not None or count_mode == 'none':
+        id_rows = yield id_query
+        return id_rows, total
+    stamp = count_cache.stamp(ITEM_COUNT_TAGS)
+    id_rows, count_rows = yield Batch(id_query, count_query, result='tuple')
+    total = count_rows[0][0] if count_rows else 0
+    count_cache.set(count_key, total, stamp)
+    return id_rows, total
+
+
+def items_by_ids_plan(item_ids, host_url, use_primary=False):
+    """查询流程片段：按 item_ids 的顺序返回商品卡片信息（不存在的ID跳过）"""
+    if not item_ids:
+        return []
+    rows = yield Query(DETAIL_SQL.format(placeholders=','.join(['%s'] * len(item_ids))), tuple(item_ids),
+                       use_primary=use_primary)
+
+    # 按 item_ids 的顺序重排（O(n)，GaussDB不支持FIELD函数）
+    rows_by_id = {row['item_id']: row for row in rows}
+    items = [rows_by_id[item_id] for item_id in item_ids if item_id in rows_by_id]
+
+    # 处理图片JSON（卡片使用缩略图）
+    for item in items:
+        images = parse_json_array(item.get('images'))
+        item['images'] = [to_public_url(variant_url(img, 'thumb'), host_url) for img in images]
+    return items
+
+
+def listing_plan(item_filter, args, host_url, use_primary=False):
+    """商品列表查询流程：按 args 中的 sort_by/sort_order/page/limit/cursor/count 取一页商品
+
+    use_primary=True 时所有查询走主库（结果要写入响应缓存时）；总数要写入 count_cache，始终从主库读取。
+    """
+    page = int(args.get('page', 1))
+    limit = int(args.get('limit', 20))
+    offset = (page - 1) * limit
+    count_mode = get_count_mode(args)
+
+    # 验证排序字段（有全文关键词时可按相关度排序，相关度固定降序）
+    sort_by = args.get('sort_by', 'publish_date')
+    sort_order = args.get('sort_order', 'DESC').upper()
+    if sort_by == 'relevance' and item_filter.match_query:
+        sort_expr, sort_params, sort_order = RELEVANCE_SQL, [item_filter.match_query], 'DESC'
+    else:
+        if sort_by not in SORT_FIELDS:
+            sort_by = 'publish_date'
+        if sort_order not in ('ASC', 'DESC'):
+            sort_order = 'DESC'
+        sort_expr, sort_params = f"i.{sort_by}", []
+
+    where_clause = item_filter.where()
+    params = list(item_filter.params)
+
+    # keyset 分页：传入 cursor 时从上一页最后一行之后开始读取（忽略 page），深翻页代价与第一页相同
+    id_where = where_clause
+    id_params = list(params)
+    if args.get('cursor'):
+        try:
+            sort_value, last_id = decode_cursor(args['cursor'], sort_by, sort_order)
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        condition, condition_params = keyset_condition(sort_expr, sort_order, sort_value, last_id,
+                                                       expr_params=sort_params)
+        id_where += " AND " + condition
+        id_params += condition_params
+        offset = 0
+
+    # 第一步：取一页 (item_id, 排序键)，多取一行用于判断是否还有下一页
+    id_sql = f"""
+    SELECT i.item_id, {sort_expr} AS sort_key
+    FROM item i
+    WHERE {id_where}
+    ORDER BY {'sort_key' if sort_params else sort_expr} {sort_order}, i.item_id {sort_order}
+    LIMIT %s OFFSET %s
+    """
+    id_params = sort_params + id_params + [limit + 1, offset]
+    count_sql = f"""
+    SELECT COUNT(*) as total
+    FROM item i
+    WHERE {where_clause}
+    """
+    id_rows, total = yield from page_ids_with_total(
+        Query(id_sql, id_params, use_primary=use_primary, result='tuple'),
+        Query(count_sql, params, use_primary=True),
+        count_cache_key(item_filter), count_mode)
+
+    next_cursor = None
+    if len(id_rows) > limit:
+        id_rows = id_rows[:limit]
+        last_id, sort_value = id_rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, sort_value, last_id)
+
+    # 第二步：获取完整信息
+    items = yield from items_by_ids_plan([row[0] for row in id_rows], host_url, use_primary)
+
+    return {
+        'items': items,
+        'pagination': pagination(page, limit, total, next_cursor is not None),
+        'next_cursor': next_cursor
+    }, 200
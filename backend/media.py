@@ -1,13 +1,20 @@
 import base64
+import hashlib
 import json
 import os
 import re
+import threading
 import uuid
 from typing import Any, List, Optional
 from urllib.parse import urlparse
 
 from werkzeug.utils import secure_filename
 
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow 未安装时不生成缩放图，列表与详情直接返回原图
+    Image = None
+
 UPLOAD_ROOT = os.path.join(os.path.dirname(__file__), "uploads")
 ITEM_UPLOAD_DIR = os.path.join(UPLOAD_ROOT, "items")
 ITEM_URL_PREFIX = "/api/uploads/items/"
@@ -23,6 +30,18 @@ MIME_TO_EXT = {
 
 _DATA_URL_RE = re.compile(r"^data:(image/[a-zA-Z0-9.+-]+);base64,(.*)$", re.DOTALL)
 
+# 上传时生成的缩放图：名称 -> 最长边像素（列表卡片用 thumb，详情页用 detail，原图保留）
+IMAGE_VARIANTS = {"thumb": 400, "detail": 1280}
+VARIANT_EXT = "webp" if Image is not None and features.check("webp") else "jpg"
+VARIANT_QUALITY = 80
+_VARIANT_NAME_RE = re.compile(r"^(?P<stem>[\w-]+)_(?P<variant>thumb|detail)\.(?:webp|jpg)$")
+
+# 原图按内容寻址：文件名为图片字节的 SHA-256，相同内容只保存一份。磁盘上的文件是唯一依据，
+# 内存索引只是缓存，复用前确认文件仍存在。上传的图片从不删除，因此不维护引用计数。
+_CONTENT_NAME_RE = re.compile(r"^([0-9a-f]{64})\.(?:jpg|jpeg|png|gif|webp)$")
+_stored_images: Optional[dict] = None  # SHA-256 -> 文件名，首次保存时从上传目录加载
+_stored_lock = threading.Lock()
+
 
 def ensure_item_upload_dir() -> None:
     os.makedirs(ITEM_UPLOAD_DIR, exist_ok=True)
@@ -59,9 +78,114 @@ def to_public_url(path_or_url: Any, host_url: str) -> Any:
     return path_or_url
 
 
-def save_upload_image(file_storage) -> str:
-    ensure_item_upload_dir()
+def variant_filename(filename: str, variant: str) -> str:
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}_{variant}.{VARIANT_EXT}"
+
+
+def generate_variants(filename: str) -> List[str]:
+    """为上传目录中的原图生成各尺寸缩放图，返回已生成的缩放图文件名
+
+    GIF 可能是动图，不生成；失败时记录日志，列表与详情回退到原图。
+    """
+    generated: List[str] = []
+    if Image is None or filename.lower().endswith(".gif"):
+        return generated
+    try:
+        with Image.open(os.path.join(ITEM_UPLOAD_DIR, filename)) as original:
+            image = ImageOps.exif_transpose(original)
+            if VARIANT_EXT == "jpg" or image.mode not in ("RGB", "RGBA"):
+                has_alpha = "A" in image.getbands() or "transparency" in image.info
+                image = image.convert("RGBA" if VARIANT_EXT == "webp" and has_alpha else "RGB")
+            for variant, max_size in IMAGE_VARIANTS.items():
+                resized = image.copy()
+                resized.thumbnail((max_size, max_size))
+                target = os.path.join(ITEM_UPLOAD_DIR, variant_filename(filename, variant))
+                # 先写临时文件再替换，避免并发请求读到写了一半的图片
+                tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+                resized.save(tmp_path, format="WEBP" if VARIANT_EXT == "webp" else "JPEG", quality=VARIANT_QUALITY)
+                os.replace(tmp_path, target)
+                generated.append(os.path.basename(target))
+    except Exception as e:
+        print(f"[图片] 生成 {filename} 的缩放图失败: {e}")
+    return generated
+
+
+def resolve_variant_file(filename: str) -> str:
+    """请求缩放图时返回实际要发送的文件名：缺失时（如旧图片）按原图补生成，仍不可用则回退到原图"""
+    match = _VARIANT_NAME_RE.match(filename)
+    if not match or os.path.exists(os.path.join(ITEM_UPLOAD_DIR, filename)):
+        return filename
+    stem = match.group("stem")
+    for ext in ALLOWED_IMAGE_EXTS:
+        original = f"{stem}.{ext}"
+        if os.path.exists(os.path.join(ITEM_UPLOAD_DIR, original)):
+            generate_variants(original)
+            if os.path.exists(os.path.join(ITEM_UPLOAD_DIR, filename)):
+                return filename
+            return original
+    return filename
+
+
+def variant_url(path: Any, variant: str) -> Any:
+    """本站上传图片的缩放图路径；外部图片、GIF 或未安装 Pillow 时返回原路径"""
+    if Image is None or not isinstance(path, str) or not path.startswith(ITEM_URL_PREFIX):
+        return path
+    filename = path[len(ITEM_URL_PREFIX):]
+    if "/" in filename or filename.lower().endswith(".gif"):
+        return path
+    return ITEM_URL_PREFIX + variant_filename(filename, variant)
+
+
+def _stored_index() -> dict:
+    global _stored_images
+    if _stored_images is None:
+        ensure_item_upload_dir()
+        index = {}
+        for name in os.listdir(ITEM_UPLOAD_DIR):
+            match = _CONTENT_NAME_RE.match(name)
+            if match:
+                index[match.group(1)] = name
+        _stored_images = index
+    return _stored_images
+
+
+def _find_stored(index: dict, digest: str, ext: str) -> Optional[str]:
+    """已保存的相同内容的文件名：先查内存索引，再查磁盘（文件被删除或由其他进程写入时以磁盘为准）"""
+    filename = index.get(digest)
+    if filename is not None and os.path.exists(os.path.join(ITEM_UPLOAD_DIR, filename)):
+        return filename
+    index.pop(digest, None)
+    for candidate_ext in [ext] + sorted(ALLOWED_IMAGE_EXTS - {ext}):
+        filename = f"{digest}.{candidate_ext}"
+        if os.path.exists(os.path.join(ITEM_UPLOAD_DIR, filename)):
+            index[digest] = filename
+            return filename
+    return None
+
+
+def store_image_bytes(raw: bytes, ext: str) -> str:
+    """按内容哈希保存原图并生成缩放图；已保存过的相同内容直接返回已有路径，不重复写入"""
+    digest = hashlib.sha256(raw).hexdigest()
+    with _stored_lock:
+        index = _stored_index()
+        filename = _find_stored(index, digest, ext)
+        if filename is not None:
+            return ITEM_URL_PREFIX + filename
+
+        filename = f"{digest}.{ext}"
+        target = os.path.join(ITEM_UPLOAD_DIR, filename)
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(raw)
+        os.replace(tmp_path, target)
+        index[digest] = filename
+
+    generate_variants(filename)
+    return ITEM_URL_PREFIX + filename
+
 
+def save_upload_image(file_storage) -> str:
     original_name = secure_filename(file_storage.filename or "")
     ext = os.path.splitext(original_name)[1].lower().lstrip(".")
     if ext == "jpeg":
@@ -73,9 +197,7 @@ def save_upload_image(file_storage) -> str:
     if not ext:
         raise ValueError("Unsupported image type")
 
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    file_storage.save(os.path.join(ITEM_UPLOAD_DIR, filename))
-    return ITEM_URL_PREFIX + filename
+    return store_image_bytes(file_storage.read(), ext)
 
 
 def save_base64_image(data_url: str) -> str:
@@ -92,11 +214,7 @@ def save_base64_image(data_url: str) -> str:
     except Exception as e:
         raise ValueError("Invalid base64 image payload") from e
 
-    ensure_item_upload_dir()
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    with open(os.path.join(ITEM_UPLOAD_DIR, filename), "wb") as f:
-        f.write(raw)
-    return ITEM_URL_PREFIX + filename
+    return store_image_bytes(raw, ext)
 
 
 def normalize_images_for_storage(images: Any, max_images: int = 9) -> List[str]:
@@ -0,0 +1,66 @@
+"""查询流程（query plan）：与驱动无关的接口查询逻辑
+
+接口的查询逻辑写成生成器：每一步 yield 一个 Query/Batch，接收执行结果，
+最后 return (响应体, 状态码)。同一个流程既可以由同步的 DatabaseManager 执行
+（Flask 视图），也可以由异步的 AsyncDatabaseManager 执行（ASGI 入口），
+SQL 与结果处理只写一份。
+"""
+
+
+class Query:
+    """一条读语句，结果为行列表（result 指定结果形式，同 execute_query）"""
+    __slots__ = ('sql', 'params', 'use_primary', 'result')
+
+    def __init__(self, sql, params=None, use_primary=False, result='dict'):
+        self.sql = sql
+        self.params = params
+        self.use_primary = use_primary
+        self.result = result
+
+
+class Batch:
+    """多条相互独立的读语句，一次往返执行，结果为各语句行列表组成的列表（各语句共用 result 形式）"""
+    __slots__ = ('queries', 'result')
+
+    def __init__(self, *queries, result='dict'):
+        self.queries = queries
+        self.result = result
+
+    def statements(self):
+        return [(query.sql, query.params) for query in self.queries]
+
+    @property
+    def use_primary(self):
+        return any(query.use_primary for query in self.queries)
+
+
+def run_plan(plan, db):
+    """用同步数据库管理器执行查询流程，返回流程的返回值"""
+    result = None
+    try:
+        while True:
+            step = plan.send(result)
+            if isinstance(step, Batch):
+                result = db.execute_batch(step.statements(), use_primary=step.use_primary,
+                                          result=step.result)
+            else:
+                result = db.execute_query(step.sql, step.params, use_primary=step.use_primary,
+                                          result=step.result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def run_plan_async(plan, db):
+    """用异步数据库管理器执行查询流程，返回流程的返回值"""
+    result = None
+    try:
+        while True:
+            step = plan.send(result)
+            if isinstance(step, Batch):
+                result = await db.execute_batch(step.statements(), use_primary=step.use_primary,
+                                                result=step.result)
+            else:
+                result = await db.execute_query(step.sql, step.params, use_primary=step.use_primary,
+                                                result=step.result)
+    except StopIteration as stop:
+        return stop.value
@@ -0,0 +1,140 @@
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """SQL指纹：去掉字面量和参数占位，折叠空白与 IN 列表，用于聚合同类语句"""
+    text = _WHITESPACE_RE.sub(' ', sql).strip()
+    text = _STRING_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _IN_LIST_RE.sub('(?+)', text)
+    return text
+
+
+def current_endpoint():
+    """当前请求的 blueprint.endpoint；请求之外返回线程名"""
+    if has_request_context():
+        return request.endpoint or request.path
+    return f'thread:{threading.current_thread().name}'
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class _Aggregate:
+    __slots__ = ('count', 'total', 'max', 'samples', 'endpoints')
+
+    def __init__(self, sample_size):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=sample_size)
+        self.endpoints = {}
+
+
+class QueryStats:
+    """按SQL指纹与接口聚合的数据库耗时统计，并记录慢查询
+
+    - slow_query_ms: 超过该毫秒数的语句输出慢查询日志（<= 0 关闭）
+    - sample_size: 每个指纹保留的最近耗时样本数，用于计算 p50/p95/p99
+    """
+
+    def __init__(self, enabled=True, slow_query_ms=200, sample_size=1000):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._queries = {}
+        self._endpoints = {}
+
+    def record(self, sql, elapsed, endpoint=None):
+        """记录一次语句执行（elapsed 单位秒；endpoint 缺省时取当前 Flask 请求的端点）"""
+        if not self.enabled:
+            return
+        elapsed_ms = elapsed * 1000.0
+        endpoint = endpoint or current_endpoint()
+        key = fingerprint(sql)
+
+        if has_request_context():
+            g.db_time_ms = g.get('db_time_ms', 0.0) + elapsed_ms
+            g.db_queries = g.get('db_queries', 0) + 1
+
+        with self._lock:
+            agg = self._queries.get(key)
+            if agg is None:
+                agg = self._queries[key] = _Aggregate(self.sample_size)
+            agg.count += 1
+            agg.total += elapsed_ms
+            agg.max = max(agg.max, elapsed_ms)
+            agg.samples.append(elapsed_ms)
+            agg.endpoints[endpoint] = agg.endpoints.get(endpoint, 0) + 1
+
+        if self.slow_query_ms > 0 and elapsed_ms >= self.slow_query_ms:
+            print(f"[慢查询] {elapsed_ms:.1f}ms {endpoint} {key[:300]}")
+
+    def record_request(self):
+        """请求结束时累计该接口的数据库耗时（在 teardown_request 中调用）"""
+        if not self.enabled or not has_request_context() or 'db_queries' not in g:
+            return
+        endpoint = current_endpoint()
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {'requests': 0, 'queries': 0, 'db_time_ms': 0.0}
+            stats['requests'] += 1
+            stats['queries'] += g.db_queries
+            stats['db_time_ms'] += g.db_time_ms
+
+    def snapshot(self, top=50, sort_by='total'):
+        """返回按 sort_by（total/count/p95/max）排序的前 top 个指纹及各接口汇总"""
+        with self._lock:
+            queries = []
+            for key, agg in self._queries.items():
+                samples = sorted(agg.samples)
+                queries.append({
+                    'fingerprint': key,
+                    'count': agg.count,
+                    'total_ms': round(agg.total, 3),
+                    'avg_ms': round(agg.total / agg.count, 3),
+                    'max_ms': round(agg.max, 3),
+                    'p50_ms': round(_percentile(samples, 50), 3),
+                    'p95_ms': round(_percentile(samples, 95), 3),
+                    'p99_ms': round(_percentile(samples, 99), 3),
+                    'endpoints': dict(agg.endpoints)
+                })
+            endpoints = []
+            for endpoint, stats in self._endpoints.items():
+                endpoints.append({
+                    'endpoint': endpoint,
+                    'requests': stats['requests'],
+                    'queries': stats['queries'],
+                    'db_time_ms': round(stats['db_time_ms'], 3),
+                    'avg_queries_per_request': round(stats['queries'] / stats['requests'], 2),
+                    'avg_db_time_ms': round(stats['db_time_ms'] / stats['requests'], 3)
+                })
+
+        sort_key = {'total': 'total_ms', 'count': 'count', 'p95': 'p95_ms', 'max': 'max_ms'}.get(sort_by, 'total_ms')
+        queries.sort(key=lambda q: q[sort_key], reverse=True)
+        endpoints.sort(key=lambda e: e['db_time_ms'], reverse=True)
+        return {'queries': queries[:top], 'endpoints': endpoints}
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._endpoints.clear()
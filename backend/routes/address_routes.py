@@ -351,10 +351,7 @@ def get_default_address(user_id):
 def get_address_statistics(user_id):
     """获取地址统计信息"""
     try:
-        # 总地址数
-        total_sql = "SELECT COUNT(*) as total_count FROM address WHERE user_id = %s"
-        
-        # 按类型统计
+        # 按类型统计（总地址数由各类型的计数求和，不再单独查询）
         type_sql = """
         SELECT address_type, COUNT(*) as count
         FROM address 
@@ -371,12 +368,14 @@ def get_address_statistics(user_id):
         ORDER BY count DESC
         """
         
-        total_result = db_manager.execute_query(total_sql, (user_id,))
-        type_stats = db_manager.execute_query(type_sql, (user_id,))
-        city_stats = db_manager.execute_query(city_sql, (user_id,))
+        # 两条统计相互独立，一次往返执行
+        type_stats, city_stats = db_manager.execute_batch([
+            (type_sql, (user_id,)),
+            (city_sql, (user_id,))
+        ])
         
         return jsonify({
-            'total_count': total_result[0]['total_count'] if total_result else 0,
+            'total_count': sum(row['count'] for row in type_stats),
             'type_stats': type_stats,
             'city_stats': city_stats
         }), 200
@@ -5,7 +5,15 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from db import db_manager
-from media import normalize_images_for_storage, parse_json_array, to_public_url
+from media import normalize_images_for_storage, parse_json_array, to_public_url, variant_url
+from query_plan import Query, run_plan
+from view_counter import view_counter
+from category_cache import category_tree
+from suggest_index import suggest_index
+from cache import count_cache, item_detail_cache, listing_cache
+from conditional import conditional_json
+from item_listing import (LISTING_TAGS, ItemFilter, facets_plan, get_facets, items_by_ids_plan,
+                          listing_cache_key, listing_plan)
 
 item_bp = Blueprint('item', __name__)
 
@@ -59,6 +67,10 @@ def create_item():
             json.dumps(images) if images else None,
             data['location']
         ))
+        category_tree.adjust(int(data['category_id']), 1)
+        count_cache.invalidate('item')
+        listing_cache.invalidate('item')
+        suggest_index.refresh(item_id)
         
         return jsonify({
             'message': 'Item created successfully',
@@ -68,365 +80,177 @@ def create_item():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def list_items_plan(args, host_url):
+    """商品浏览查询流程（Flask 视图与 ASGI 异步接口共用）"""
+    item_filter = ItemFilter()
+    item_filter.add("i.status = %s", args.get('status', 'available'))
+    if args.get('category_id'):
+        item_filter.add("i.category_id = %s", args['category_id'])
+    if args.get('min_price'):
+        item_filter.add("i.price >= %s", float(args['min_price']))
+    if args.get('max_price'):
+        item_filter.add("i.price <= %s", float(args['max_price']))
+
+    # 前几页列表对所有访问者相同：命中响应缓存时不访问数据库
+    cache_key = listing_cache_key(args, host_url)
+    if cache_key is not None:
+        body = listing_cache.get(cache_key)
+        if body is not None:
+            return body, 200
+        stamp = listing_cache.stamp(LISTING_TAGS)
+
+    # sort_by: publish_date, price, view_count, wishlist_count
+    # 要写入缓存的页从主库读取：副本延迟的旧数据一旦缓存，会在整个有效期内被返回
+    body, status = yield from listing_plan(item_filter, args, host_url, use_primary=cache_key is not None)
+    if cache_key is not None and status == 200:
+        listing_cache.set(cache_key, body, stamp)
+    return body, status
+
 @item_bp.route('/', methods=['GET'])
 def get_items():
     """商品浏览 - SELECT with JOIN操作"""
     try:
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
-        category_id = request.args.get('category_id')
-        status = request.args.get('status', 'available')
-        sort_by = request.args.get('sort_by', 'publish_date')  # publish_date, price, view_count, wishlist_count
-        sort_order = request.args.get('sort_order', 'DESC')
-        min_price = request.args.get('min_price')
-        max_price = request.args.get('max_price')
-
-        offset = (page - 1) * limit
-
-        # 构建WHERE条件
-        where_conditions = ["i.status = %s"]
-        params = [status]
-
-        if category_id:
-            where_conditions.append("i.category_id = %s")
-            params.append(category_id)
-
-        if min_price:
-            where_conditions.append("i.price >= %s")
-            params.append(float(min_price))
-
-        if max_price:
-            where_conditions.append("i.price <= %s")
-            params.append(float(max_price))
-
-        where_clause = " AND ".join(where_conditions)
-
-        # 验证排序字段
-        valid_sort_fields = ['publish_date', 'price', 'view_count', 'wishlist_count']
-        if sort_by not in valid_sort_fields:
-            sort_by = 'publish_date'
-
-        if sort_order.upper() not in ['ASC', 'DESC']:
-            sort_order = 'DESC'
-
-        # 按收藏数排序需要特殊处理
-        if sort_by == 'wishlist_count':
-            # 使用两步查询避免内存排序问题
-            # 第一步：获取排序后的item_id列表
-            id_sql = f"""
-            SELECT i.item_id,
-                   (SELECT COUNT(*) FROM wishlist w WHERE w.item_id = i.item_id) as wishlist_count
-            FROM item i
-            WHERE {where_clause}
-            ORDER BY wishlist_count {sort_order}, i.item_id DESC
-            LIMIT %s OFFSET %s
-            """
-            id_params = params + [limit, offset]
-            id_result = db_manager.execute_query(id_sql, id_params)
-
-            if not id_result:
-                return jsonify({
-                    'items': [],
-                    'pagination': {'page': page, 'limit': limit, 'total': 0, 'pages': 0}
-                }), 200
-
-            item_ids = [row['item_id'] for row in id_result]
-            wishlist_counts = {row['item_id']: row['wishlist_count'] for row in id_result}
-            placeholders = ','.join(['%s'] * len(item_ids))
-
-            # 第二步：获取完整信息
-            sql = f"""
-            SELECT i.item_id, i.title, i.description, i.price, i.original_price,
-                   i.condition_level, i.images, i.location, i.publish_date, i.view_count,
-                   i.user_id, i.category_id,
-                   u.username, u.avatar, u.credit_score,
-                   c.category_name
-            FROM item i
-            JOIN user u ON i.user_id = u.user_id
-            JOIN category c ON i.category_id = c.category_id
-            WHERE i.item_id IN ({placeholders})
-            """
-            items = db_manager.execute_query(sql, tuple(item_ids))
-
-            # 添加wishlist_count并按原顺序排序
-            for item in items:
-                item['wishlist_count'] = wishlist_counts.get(item['item_id'], 0)
-            items.sort(key=lambda x: item_ids.index(x['item_id']))
-        else:
-            # 其他排序使用优化的子查询方式
-            # 第一步：获取ID列表
-            id_sql = f"""
-            SELECT item_id FROM item
-            WHERE {where_clause.replace('i.', '')}
-            ORDER BY {sort_by} {sort_order}
-            LIMIT %s OFFSET %s
-            """
-            id_params = params + [limit, offset]
-            id_result = db_manager.execute_query(id_sql, id_params)
-
-            if not id_result:
-                return jsonify({
-                    'items': [],
-                    'pagination': {'page': page, 'limit': limit, 'total': 0, 'pages': 0}
-                }), 200
-
-            item_ids = [row['item_id'] for row in id_result]
-            placeholders = ','.join(['%s'] * len(item_ids))
-
-            # 第二步：获取完整信息
-            sql = f"""
-            SELECT i.item_id, i.title, i.description, i.price, i.original_price,
-                   i.condition_level, i.images, i.location, i.publish_date, i.view_count,
-                   i.user_id, i.category_id,
-                   u.username, u.avatar, u.credit_score,
-                   c.category_name,
-                   (SELECT COUNT(*) FROM wishlist w WHERE w.item_id = i.item_id) as wishlist_count
-            FROM item i
-            JOIN user u ON i.user_id = u.user_id
-            JOIN category c ON i.category_id = c.category_id
-            WHERE i.item_id IN ({placeholders})
-            """
-            items = db_manager.execute_query(sql, tuple(item_ids))
-
-            # 按原顺序排序（GaussDB不支持FIELD函数）
-            items.sort(key=lambda x: item_ids.index(x['item_id']))
-
-        # 处理图片JSON
-        for item in items:
-            images = parse_json_array(item.get('images'))
-            item['images'] = [to_public_url(img, request.host_url) for img in images]
-
-        # 获取总数
-        count_sql = f"""
-        SELECT COUNT(*) as total
-        FROM item i
-        WHERE {where_clause}
-        """
-        count_result = db_manager.execute_query(count_sql, params)
-        total = count_result[0]['total']
-
-        return jsonify({
-            'items': items,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
-        }), 200
+        body, status = run_plan(list_items_plan(request.args, request.host_url), db_manager)
+        return conditional_json(body, status)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def search_items_plan(args, host_url):
+    """商品搜索查询流程（Flask 视图与 ASGI 异步接口共用）"""
+    item_filter = ItemFilter()
+    item_filter.add("i.status = %s", 'available')
+    item_filter.keyword(args.get('keyword', ''))
+    if args.get('category_id'):
+        item_filter.add("i.category_id = %s", args['category_id'])
+    if args.get('min_price'):
+        item_filter.add("i.price >= %s", float(args['min_price']))
+    if args.get('max_price'):
+        item_filter.add("i.price <= %s", float(args['max_price']))
+    if args.get('condition_level'):
+        item_filter.add("i.condition_level = %s", args['condition_level'])
+
+    # 分面统计（facets=all 或 category,condition,price）：一条分组查询得到全部分面及总数
+    facet_names = get_facets(args)
+    facets = (yield from facets_plan(item_filter)) if facet_names else None
+
+    # sort_by: publish_date, price, view_count, wishlist_count, relevance（仅全文检索时）
+    body, status = yield from listing_plan(item_filter, args, host_url)
+    if facets is not None and status == 200:
+        body['facets'] = {name: facets[name] for name in facet_names}
+    return body, status
+
 @item_bp.route('/search', methods=['GET'])
 def search_items():
     """商品搜索 - SELECT with JOIN和全文搜索"""
     try:
-        keyword = request.args.get('keyword', '')
-        category_id = request.args.get('category_id')
-        min_price = request.args.get('min_price')
-        max_price = request.args.get('max_price')
-        condition_level = request.args.get('condition_level')
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
-        sort_by = request.args.get('sort_by', 'publish_date')
-        sort_order = request.args.get('sort_order', 'DESC')
-
-        offset = (page - 1) * limit
+        body, status = run_plan(search_items_plan(request.args, request.host_url), db_manager)
+        return conditional_json(body, status)
 
-        # 构建WHERE条件
-        where_conditions = ["i.status = 'available'"]
-        params = []
-
-        if keyword:
-            where_conditions.append("(i.title LIKE %s OR i.description LIKE %s)")
-            keyword_pattern = f"%{keyword}%"
-            params.extend([keyword_pattern, keyword_pattern])
-
-        if category_id:
-            where_conditions.append("i.category_id = %s")
-            params.append(category_id)
-
-        if min_price:
-            where_conditions.append("i.price >= %s")
-            params.append(float(min_price))
-
-        if max_price:
-            where_conditions.append("i.price <= %s")
-            params.append(float(max_price))
-
-        if condition_level:
-            where_conditions.append("i.condition_level = %s")
-            params.append(condition_level)
-
-        where_clause = " AND ".join(where_conditions)
-
-        # 验证排序字段
-        valid_sort_fields = ['publish_date', 'price', 'view_count', 'wishlist_count']
-        if sort_by not in valid_sort_fields:
-            sort_by = 'publish_date'
-
-        if sort_order.upper() not in ['ASC', 'DESC']:
-            sort_order = 'DESC'
-
-        # 按收藏数排序需要特殊处理
-        if sort_by == 'wishlist_count':
-            # 第一步：获取排序后的item_id列表
-            id_sql = f"""
-            SELECT i.item_id,
-                   (SELECT COUNT(*) FROM wishlist w WHERE w.item_id = i.item_id) as wishlist_count
-            FROM item i
-            WHERE {where_clause}
-            ORDER BY wishlist_count {sort_order}, i.item_id DESC
-            LIMIT %s OFFSET %s
-            """
-            id_params = params + [limit, offset]
-            id_result = db_manager.execute_query(id_sql, id_params)
-
-            if not id_result:
-                return jsonify({'items': []}), 200
-
-            item_ids = [row['item_id'] for row in id_result]
-            wishlist_counts = {row['item_id']: row['wishlist_count'] for row in id_result}
-            placeholders = ','.join(['%s'] * len(item_ids))
-
-            # 第二步：获取完整信息
-            sql = f"""
-            SELECT i.item_id, i.title, i.description, i.price, i.original_price,
-                   i.condition_level, i.images, i.location, i.publish_date, i.view_count,
-                   i.user_id, i.category_id,
-                   u.username, u.avatar, u.credit_score,
-                   c.category_name
-            FROM item i
-            JOIN user u ON i.user_id = u.user_id
-            JOIN category c ON i.category_id = c.category_id
-            WHERE i.item_id IN ({placeholders})
-            """
-            items = db_manager.execute_query(sql, tuple(item_ids))
-
-            # 添加wishlist_count并按原顺序排序
-            for item in items:
-                item['wishlist_count'] = wishlist_counts.get(item['item_id'], 0)
-            items.sort(key=lambda x: item_ids.index(x['item_id']))
-        else:
-            # 其他排序使用两步查询方式
-            # 构建子查询的WHERE条件（不带表别名）
-            sub_where_conditions = ["status = 'available'"]
-            sub_params = []
-
-            if keyword:
-                sub_where_conditions.append("(title LIKE %s OR description LIKE %s)")
-                sub_params.extend([keyword_pattern, keyword_pattern])
-
-            if category_id:
-                sub_where_conditions.append("category_id = %s")
-                sub_params.append(category_id)
-
-            if min_price:
-                sub_where_conditions.append("price >= %s")
-                sub_params.append(float(min_price))
-
-            if max_price:
-                sub_where_conditions.append("price <= %s")
-                sub_params.append(float(max_price))
-
-            if condition_level:
-                sub_where_conditions.append("condition_level = %s")
-                sub_params.append(condition_level)
-
-            sub_where_clause = " AND ".join(sub_where_conditions)
-
-            # 第一步：获取ID列表
-            id_sql = f"""
-            SELECT item_id FROM item
-            WHERE {sub_where_clause}
-            ORDER BY {sort_by} {sort_order}
-            LIMIT %s OFFSET %s
-            """
-            id_params = sub_params + [limit, offset]
-            id_result = db_manager.execute_query(id_sql, id_params)
-
-            if not id_result:
-                return jsonify({'items': []}), 200
-
-            item_ids = [row['item_id'] for row in id_result]
-            placeholders = ','.join(['%s'] * len(item_ids))
-
-            # 第二步：获取完整信息
-            sql = f"""
-            SELECT i.item_id, i.title, i.description, i.price, i.original_price,
-                   i.condition_level, i.images, i.location, i.publish_date, i.view_count,
-                   i.user_id, i.category_id,
-                   u.username, u.avatar, u.credit_score,
-                   c.category_name,
-                   (SELECT COUNT(*) FROM wishlist w WHERE w.item_id = i.item_id) as wishlist_count
-            FROM item i
-            JOIN user u ON i.user_id = u.user_id
-            JOIN category c ON i.category_id = c.category_id
-            WHERE i.item_id IN ({placeholders})
-            """
-            items = db_manager.execute_query(sql, tuple(item_ids))
-
-            # 按原顺序排序（GaussDB不支持FIELD函数）
-            items.sort(key=lambda x: item_ids.index(x['item_id']))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        # 处理图片JSON
-        for item in items:
-            images = parse_json_array(item.get('images'))
-            item['images'] = [to_public_url(img, request.host_url) for img in images]
+def item_detail_plan(item_id, host_url):
+    """商品详情查询流程（Flask 视图与 ASGI 异步接口共用）"""
+    # 组装好的详情文档按商品缓存；浏览次数由 view_counter 的累计数叠加，不使缓存失效
+    cache_key = (item_id, host_url)
+    cached = item_detail_cache.get(cache_key)
+    if cached is not None:
+        document, view_base = cached
+        view_counter.add(item_id)
+        item = dict(document)
+        item['view_count'] = view_base + view_counter.counts(item_id)[1]
+        return {'item': item}, 200
+    stamp = item_detail_cache.stamp((f'item:{item_id}',))
+
+    # 获取商品详情
+    sql = """
+    SELECT i.*, u.username, u.avatar, u.credit_score, u.phone,
+           c.category_name
+    FROM item i
+    JOIN user u ON i.user_id = u.user_id
+    JOIN category c ON i.category_id = c.category_id
+    WHERE i.item_id = %s
+    """
+
+    # 结果写入详情缓存，从主库读取（见 list_items_plan）
+    items = yield Query(sql, (item_id,), use_primary=True)
+
+    if not items:
+        return {'error': 'Item not found'}, 404
+
+    item = items[0]
+
+    # 浏览次数先记入内存缓冲，由 view_counter 批量写回；返回值包含尚未写回的部分
+    view_counter.add(item_id)
+    pending, total = view_counter.counts(item_id)
+    item['view_count'] = (item['view_count'] or 0) + pending
+
+    # 处理图片JSON
+    images = parse_json_array(item.get('images'))
+    item['images'] = [to_public_url(img, host_url) for img in images]
+    # 详情页展示用的缩放图（images 保留原图，编辑商品时原样提交）
+    item['detail_images'] = [to_public_url(variant_url(img, 'detail'), host_url) for img in images]
+
+    stamp += item_detail_cache.stamp((f"user:{item['user_id']}",))
+    item_detail_cache.set(cache_key, (dict(item), item['view_count'] - total), stamp)
+    return {'item': item}, 200
+
+# 批量获取商品卡片时单次最多的商品数
+BATCH_MAX_ITEMS = 50
+
+def batch_items_plan(args, host_url):
+    """批量获取商品卡片流程（Flask 视图与 ASGI 异步接口共用）：按请求顺序返回，不计浏览次数"""
+    raw_ids = [value for arg in args.getlist('ids') for value in arg.split(',') if value.strip()]
+    if not raw_ids:
+        return {'error': 'ids is required'}, 400
+    try:
+        item_ids = list(dict.fromkeys(int(value) for value in raw_ids))
+    except ValueError:
+        return {'error': 'ids must be integers'}, 400
+    if len(item_ids) > BATCH_MAX_ITEMS:
+        return {'error': f'Maximum {BATCH_MAX_ITEMS} items can be fetched at once'}, 400
+
+    items = yield from items_by_ids_plan(item_ids, host_url)
+    return {'items': items}, 200
+
+@item_bp.route('/batch', methods=['GET'])
+def get_items_batch():
+    """批量获取商品 - 单次 SELECT ... IN 查询"""
+    try:
+        body, status = run_plan(batch_items_plan(request.args, request.host_url), db_manager)
+        return conditional_json(body, status)
 
-        # 获取总数用于分页
-        count_sql = f"""
-        SELECT COUNT(*) as total FROM item i
-        WHERE {where_clause}
-        """
-        count_result = db_manager.execute_query(count_sql, params)
-        total = count_result[0]['total'] if count_result else 0
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-        return jsonify({
-            'items': items,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
-        }), 200
+@item_bp.route('/suggest', methods=['GET'])
+def suggest_items():
+    """标题补全 - 内存前缀索引，不访问数据库"""
+    try:
+        limit = min(int(request.args.get('limit', 10)), 20)
+        suggestions = suggest_index.suggest(request.args.get('q', ''), limit)
+        return jsonify({'suggestions': suggestions}), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def item_detail_validators(body):
+    """商品详情的 (ETag 数据, 最后修改时间)
+
+    浏览次数每次访问都会变化，不参与 ETag（写回浏览次数时不改动 update_date）
+    """
+    item = body.get('item', {})
+    etag_source = {key: value for key, value in item.items() if key != 'view_count'}
+    return etag_source, item.get('update_date')
+
 @item_bp.route('/<int:item_id>', methods=['GET'])
 def get_item(item_id):
     """获取商品详情并增加浏览次数"""
     try:
-        # 增加浏览次数
-        update_view_sql = "UPDATE item SET view_count = view_count + 1 WHERE item_id = %s"
-        db_manager.execute_update(update_view_sql, (item_id,))
-
-        # 获取商品详情
-        sql = """
-        SELECT i.*, u.username, u.avatar, u.credit_score, u.phone,
-               c.category_name,
-               (SELECT COUNT(*) FROM wishlist w WHERE w.item_id = i.item_id) as wishlist_count
-        FROM item i
-        JOIN user u ON i.user_id = u.user_id
-        JOIN category c ON i.category_id = c.category_id
-        WHERE i.item_id = %s
-        """
-
-        items = db_manager.execute_query(sql, (item_id,))
-
-        if not items:
-            return jsonify({'error': 'Item not found'}), 404
-
-        item = items[0]
-
-        # 处理图片JSON
-        images = parse_json_array(item.get('images'))
-        item['images'] = [to_public_url(img, request.host_url) for img in images]
-
-        return jsonify({'item': item}), 200
+        body, status = run_plan(item_detail_plan(item_id, request.host_url), db_manager)
+        etag_source, last_modified = item_detail_validators(body)
+        return conditional_json(body, status, last_modified=last_modified, etag_source=etag_source)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -441,6 +265,12 @@ def update_item(item_id):
         if not user_id:
             return jsonify({'error': 'user_id is required'}), 400
         
+        # 先保存图片并生成缩放图：耗时的图片处理在借出数据库连接之前完成
+        if 'images' in data:
+            if len(data['images']) > 9:
+                return jsonify({'error': 'Maximum 9 images allowed'}), 400
+            images = normalize_images_for_storage(data['images'])
+        
         # 验证是否为商品发布者
         check_sql = "SELECT user_id FROM item WHERE item_id = %s"
         result = db_manager.execute_query(check_sql, (item_id,))
@@ -464,12 +294,9 @@ def update_item(item_id):
                     return jsonify({'error': 'Title must be less than 100 characters'}), 400
                 if field == 'description' and len(data[field]) > 1000:
                     return jsonify({'error': 'Description must be less than 1000 characters'}), 400
-                if field == 'images' and len(data[field]) > 9:
-                    return jsonify({'error': 'Maximum 9 images allowed'}), 400
                 
                 if field == 'images':
-                    normalized = normalize_images_for_storage(data[field])
-                    update_data[field] = json.dumps(normalized) if normalized else None
+                    update_data[field] = json.dumps(images) if images else None
                 else:
                     update_data[field] = data[field]
         
@@ -482,6 +309,10 @@ def update_item(item_id):
         
         params = list(update_data.values()) + [datetime.now(), item_id]
         db_manager.execute_update(update_sql, params)
+        count_cache.invalidate('item')
+        listing_cache.invalidate('item')
+        item_detail_cache.invalidate(f'item:{item_id}')
+        suggest_index.refresh(item_id)
         
         return jsonify({'message': 'Item updated successfully'}), 200
         
@@ -498,19 +329,26 @@ def delete_item(item_id):
         if not user_id:
             return jsonify({'error': 'user_id is required'}), 400
         
-        # 验证是否为商品发布者
-        check_sql = "SELECT user_id FROM item WHERE item_id = %s"
-        result = db_manager.execute_query(check_sql, (item_id,))
-        
-        if not result:
-            return jsonify({'error': 'Item not found'}), 404
-        
-        if result[0]['user_id'] != user_id:
-            return jsonify({'error': 'Permission denied'}), 403
-        
-        # 软删除：将状态设为removed
-        sql = "UPDATE item SET status = 'removed' WHERE item_id = %s"
-        db_manager.execute_update(sql, (item_id,))
+        with db_manager.transaction():
+            # 验证是否为商品发布者（在主库上锁定商品行，下架前的状态决定分类计数是否变化）
+            check_sql = "SELECT user_id, category_id, status FROM item WHERE item_id = %s FOR UPDATE"
+            result = db_manager.execute_query(check_sql, (item_id,), use_primary=True)
+
+            if not result:
+                return jsonify({'error': 'Item not found'}), 404
+
+            if result[0]['user_id'] != user_id:
+                return jsonify({'error': 'Permission denied'}), 403
+
+            # 软删除：将状态设为removed
+            sql = "UPDATE item SET status = 'removed' WHERE item_id = %s"
+            db_manager.execute_update(sql, (item_id,))
+        if result[0]['status'] == 'available':
+            category_tree.adjust(result[0]['category_id'], -1)
+        count_cache.invalidate('item')
+        listing_cache.invalidate('item')
+        item_detail_cache.invalidate(f'item:{item_id}')
+        suggest_index.refresh(item_id)
         
         return jsonify({'message': 'Item removed successfully'}), 200
         
@@ -519,43 +357,9 @@ def delete_item(item_id):
 
 @item_bp.route('/categories', methods=['GET'])
 def get_categories():
-    """获取商品分类"""
+    """获取商品分类（分类树及在售商品数缓存在内存中）"""
     try:
-        sql = """
-        SELECT c.category_id, c.category_name, c.parent_category_id, c.description,
-               COUNT(i.item_id) as item_count
-        FROM category c
-        LEFT JOIN item i ON c.category_id = i.category_id AND i.status = 'available'
-        GROUP BY c.category_id, c.category_name, c.parent_category_id, c.description
-        ORDER BY c.sort_order, c.category_name
-        """
-        
-        categories = db_manager.execute_query(sql)
-        
-        # 构建分类树
-        category_tree = []
-        category_map = {}
-        
-        # 先创建所有分类的映射
-        for cat in categories:
-            category_map[cat['category_id']] = {
-                'category_id': cat['category_id'],
-                'category_name': cat['category_name'],
-                'description': cat['description'],
-                'item_count': cat['item_count'],
-                'children': []
-            }
-        
-        # 构建树结构
-        for cat in categories:
-            if cat['parent_category_id'] is None:
-                category_tree.append(category_map[cat['category_id']])
-            else:
-                parent = category_map.get(cat['parent_category_id'])
-                if parent:
-                    parent['children'].append(category_map[cat['category_id']])
-        
-        return jsonify({'categories': category_tree}), 200
+        return conditional_json({'categories': category_tree.get_tree()})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -569,15 +373,14 @@ def get_user_items(user_id):
         limit = int(request.args.get('limit', 20))
         offset = (page - 1) * limit
 
-        # 单次查询：使用相关子查询获取收藏数
-        # 虽然子查询对每行执行一次，但只需一次数据库连接（节省100-200ms）
+        # 单次查询：收藏数直接读取 item.wishlist_count 计数列
         sql = """
         SELECT i.item_id, i.title, i.description, i.price, i.images, i.status,
                i.publish_date, i.view_count, i.condition_level, i.location,
                i.user_id, i.category_id,
                u.username, u.avatar, u.credit_score,
                c.category_name,
-               (SELECT COUNT(*) FROM wishlist w WHERE w.item_id = i.item_id) as wishlist_count
+               i.wishlist_count
         FROM item i
         JOIN user u ON i.user_id = u.user_id
         JOIN category c ON i.category_id = c.category_id
@@ -591,9 +394,9 @@ def get_user_items(user_id):
         # 处理图片JSON
         for item in items:
             images = parse_json_array(item.get('images'))
-            item['images'] = [to_public_url(img, request.host_url) for img in images]
+            item['images'] = [to_public_url(variant_url(img, 'thumb'), request.host_url) for img in images]
 
-        return jsonify({'items': items}), 200
+        return conditional_json({'items': items})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -4,7 +4,8 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from db import db_manager
-from media import parse_json_array, to_public_url
+from media import parse_json_array, to_public_url, variant_url
+from query_plan import Query, run_plan
 
 message_bp = Blueprint('message', __name__)
 
@@ -65,44 +66,49 @@ def send_message():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def conversations_plan(user_id, host_url):
+    """会话列表查询流程（Flask 视图与 ASGI 异步接口共用）"""
+    sql = """
+    SELECT 
+        CASE 
+            WHEN m.sender_id = %s THEN m.receiver_id 
+            ELSE m.sender_id 
+        END as other_user_id,
+        u.username as other_username,
+        u.avatar as other_avatar,
+        m.item_id,
+        i.title as item_title,
+        i.images as item_images,
+        MAX(m.send_time) as last_message_time,
+        (SELECT content FROM message m2 
+         WHERE ((m2.sender_id = %s AND m2.receiver_id = other_user_id) OR 
+                (m2.sender_id = other_user_id AND m2.receiver_id = %s))
+           AND m2.item_id = m.item_id
+         ORDER BY m2.send_time DESC LIMIT 1) as last_message,
+        COUNT(CASE WHEN m.receiver_id = %s AND m.is_read = FALSE THEN 1 END) as unread_count
+    FROM message m
+    JOIN user u ON (CASE WHEN m.sender_id = %s THEN m.receiver_id ELSE m.sender_id END) = u.user_id
+    JOIN item i ON m.item_id = i.item_id
+    WHERE m.sender_id = %s OR m.receiver_id = %s
+    GROUP BY other_user_id, m.item_id, u.username, u.avatar, i.title, i.images
+    ORDER BY last_message_time DESC
+    """
+    
+    conversations = yield Query(sql, (user_id, user_id, user_id, user_id, user_id, user_id, user_id))
+    
+    # 处理图片JSON
+    for conv in conversations:
+        images = parse_json_array(conv.get('item_images'))
+        conv['item_images'] = [to_public_url(variant_url(img, 'thumb'), host_url) for img in images]
+    
+    return {'conversations': conversations}, 200
+
 @message_bp.route('/conversations/<int:user_id>', methods=['GET'])
 def get_conversations(user_id):
     """获取用户的会话列表"""
     try:
-        sql = """
-        SELECT 
-            CASE 
-                WHEN m.sender_id = %s THEN m.receiver_id 
-                ELSE m.sender_id 
-            END as other_user_id,
-            u.username as other_username,
-            u.avatar as other_avatar,
-            m.item_id,
-            i.title as item_title,
-            i.images as item_images,
-            MAX(m.send_time) as last_message_time,
-            (SELECT content FROM message m2 
-             WHERE ((m2.sender_id = %s AND m2.receiver_id = other_user_id) OR 
-                    (m2.sender_id = other_user_id AND m2.receiver_id = %s))
-               AND m2.item_id = m.item_id
-             ORDER BY m2.send_time DESC LIMIT 1) as last_message,
-            COUNT(CASE WHEN m.receiver_id = %s AND m.is_read = FALSE THEN 1 END) as unread_count
-        FROM message m
-        JOIN user u ON (CASE WHEN m.sender_id = %s THEN m.receiver_id ELSE m.sender_id END) = u.user_id
-        JOIN item i ON m.item_id = i.item_id
-        WHERE m.sender_id = %s OR m.receiver_id = %s
-        GROUP BY other_user_id, m.item_id, u.username, u.avatar, i.title, i.images
-        ORDER BY last_message_time DESC
-        """
-        
-        conversations = db_manager.execute_query(sql, (user_id, user_id, user_id, user_id, user_id, user_id, user_id))
-        
-        # 处理图片JSON
-        for conv in conversations:
-            images = parse_json_array(conv.get('item_images'))
-            conv['item_images'] = [to_public_url(img, request.host_url) for img in images]
-        
-        return jsonify({'conversations': conversations}), 200
+        body, status = run_plan(conversations_plan(user_id, request.host_url), db_manager)
+        return jsonify(body), status
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -157,9 +163,10 @@ def get_conversation_messages():
             LIMIT %s OFFSET %s
             """
 
+        # 聊天窗口需要立即看到刚发送的消息，读主库
         messages = db_manager.execute_query(sql, (
             user_id, other_user_id, other_user_id, user_id, item_id, limit, offset
-        ))
+        ), use_primary=True)
 
         # 标记消息为已读
         mark_read_sql = """
@@ -203,20 +210,25 @@ def mark_message_read(message_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def unread_count_plan(user_id):
+    """未读消息数查询流程（Flask 视图与 ASGI 异步接口共用）"""
+    sql = """
+    SELECT COUNT(*) as unread_count
+    FROM message 
+    WHERE receiver_id = %s AND is_read = FALSE
+    """
+    
+    result = yield Query(sql, (user_id,))
+    unread_count = result[0]['unread_count'] if result else 0
+    
+    return {'unread_count': unread_count}, 200
+
 @message_bp.route('/unread/<int:user_id>', methods=['GET'])
 def get_unread_count(user_id):
     """获取未读消息数量"""
     try:
-        sql = """
-        SELECT COUNT(*) as unread_count
-        FROM message 
-        WHERE receiver_id = %s AND is_read = FALSE
-        """
-        
-        result = db_manager.execute_query(sql, (user_id,))
-        unread_count = result[0]['unread_count'] if result else 0
-        
-        return jsonify({'unread_count': unread_count}), 200
+        body, status = run_plan(unread_count_plan(user_id), db_manager)
+        return jsonify(body), status
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
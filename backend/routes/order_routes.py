@@ -4,10 +4,17 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from db import db_manager
-from media import parse_json_array, to_public_url
+from media import parse_json_array, to_public_url, variant_url
+from category_cache import category_tree
+from suggest_index import suggest_index
+from cache import count_cache, item_detail_cache, listing_cache, get_count_mode, pagination
+from conditional import conditional_json
 
 order_bp = Blueprint('order', __name__)
 
+# 订单列表总数依赖的表
+ORDER_COUNT_TAGS = ('order',)
+
 @order_bp.route('/', methods=['POST'])
 def create_order():
     """订单创建 - INSERT操作"""
@@ -29,60 +36,68 @@ def create_order():
         if delivery_method == 'express' and not address_id:
             return jsonify({'error': 'address_id is required for express delivery'}), 400
         
-        # 获取商品信息
-        item_sql = """
-        SELECT user_id as seller_id, price, status, title
-        FROM item 
-        WHERE item_id = %s
-        """
-        item_result = db_manager.execute_query(item_sql, (item_id,))
-        
-        if not item_result:
-            return jsonify({'error': 'Item not found'}), 404
-        
-        item = item_result[0]
-        
-        # 验证商品状态
-        if item['status'] != 'available':
-            return jsonify({'error': 'Item is not available'}), 400
-        
-        # 验证不能购买自己的商品
-        if item['seller_id'] == buyer_id:
-            return jsonify({'error': 'Cannot buy your own item'}), 400
+        # 校验、下单与商品状态更新在同一事务中完成（一次借用连接、一次提交）
+        with db_manager.transaction():
+            # 获取商品信息
+            item_sql = """
+            SELECT user_id as seller_id, price, status, title, category_id
+            FROM item 
+            WHERE item_id = %s
+            FOR UPDATE
+            """
+            item_result = db_manager.execute_query(item_sql, (item_id,))
+        
+            if not item_result:
+                return jsonify({'error': 'Item not found'}), 404
+        
+            item = item_result[0]
+        
+            # 验证商品状态
+            if item['status'] != 'available':
+                return jsonify({'error': 'Item is not available'}), 400
+        
+            # 验证不能购买自己的商品
+            if item['seller_id'] == buyer_id:
+                return jsonify({'error': 'Cannot buy your own item'}), 400
 
-        # 验证地址是否属于买家（仅当提供了地址时）
-        if address_id:
-            address_sql = "SELECT user_id FROM address WHERE address_id = %s"
-            address_result = db_manager.execute_query(address_sql, (address_id,))
+            # 验证地址是否属于买家（仅当提供了地址时）
+            if address_id:
+                address_sql = "SELECT user_id FROM address WHERE address_id = %s"
+                address_result = db_manager.execute_query(address_sql, (address_id,))
 
-            if not address_result or address_result[0]['user_id'] != buyer_id:
-                return jsonify({'error': 'Invalid address'}), 400
-        
-        # 生成订单号
-        order_number = db_manager.generate_order_number()
-        
-        # 创建订单
-        insert_sql = """
-        INSERT INTO `order` (order_number, buyer_id, seller_id, item_id, address_id,
-                           total_amount, payment_method, delivery_method, notes)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        order_id = db_manager.execute_insert(insert_sql, (
-            order_number,
-            buyer_id,
-            item['seller_id'],
-            item_id,
-            address_id,
-            item['price'],
-            data['payment_method'],
-            data['delivery_method'],
-            data.get('notes')
-        ))
-        
-        # 更新商品状态为已售出
-        update_item_sql = "UPDATE item SET status = 'sold' WHERE item_id = %s"
-        db_manager.execute_update(update_item_sql, (item_id,))
+                if not address_result or address_result[0]['user_id'] != buyer_id:
+                    return jsonify({'error': 'Invalid address'}), 400
+        
+            # 生成订单号
+            order_number = db_manager.generate_order_number()
+        
+            # 创建订单
+            insert_sql = """
+            INSERT INTO `order` (order_number, buyer_id, seller_id, item_id, address_id,
+                               total_amount, payment_method, delivery_method, notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+        
+            order_id = db_manager.execute_insert(insert_sql, (
+                order_number,
+                buyer_id,
+                item['seller_id'],
+                item_id,
+                address_id,
+                item['price'],
+                data['payment_method'],
+                data['delivery_method'],
+                data.get('notes')
+            ))
+        
+            # 更新商品状态为已售出
+            update_item_sql = "UPDATE item SET status = 'sold' WHERE item_id = %s"
+            db_manager.execute_update(update_item_sql, (item_id,))
+        category_tree.adjust(item['category_id'], -1)
+        count_cache.invalidate('item', 'order')
+        listing_cache.invalidate('item')
+        item_detail_cache.invalidate(f'item:{item_id}')
+        suggest_index.refresh(item_id)
         
         return jsonify({
             'message': 'Order created successfully',
@@ -114,7 +129,8 @@ def get_order(order_id):
         WHERE o.order_id = %s
         """
         
-        orders = db_manager.execute_query(sql, (order_id,))
+        # 下单/改状态后立即查看详情，读主库避免副本延迟导致读不到
+        orders = db_manager.execute_query(sql, (order_id,), use_primary=True)
         
         if not orders:
             return jsonify({'error': 'Order not found'}), 404
@@ -124,7 +140,7 @@ def get_order(order_id):
         images = parse_json_array(order.get('item_images'))
         order['item_images'] = [to_public_url(img, request.host_url) for img in images]
         
-        return jsonify({'order': order}), 200
+        return conditional_json({'order': order})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -138,6 +154,7 @@ def get_user_orders(user_id):
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 20))
         offset = (page - 1) * limit
+        count_mode = get_count_mode(request.args)
         
         # 构建WHERE条件
         where_conditions = []
@@ -170,34 +187,40 @@ def get_user_orders(user_id):
         LIMIT %s OFFSET %s
         """
         
-        params.extend([limit, offset])
-        orders = db_manager.execute_query(sql, params)
-        
-        # 处理图片JSON
-        for order in orders:
-            images = parse_json_array(order.get('item_images'))
-            order['item_images'] = [to_public_url(img, request.host_url) for img in images]
-
-        # 获取总数用于分页
+        # 总数用于分页（命中缓存或 count=none 时不查询）
         count_sql = f"""
         SELECT COUNT(*) as total
         FROM `order` o
         WHERE {where_clause}
         """
-        # 移除limit和offset参数，只保留条件参数
-        count_params = params[:-2]  # params结构: [条件参数..., limit, offset]
-        count_result = db_manager.execute_query(count_sql, count_params)
-        total = count_result[0]['total'] if count_result else 0
+        count_params = list(params)
+        count_key = ('user_orders', where_clause, tuple(count_params))
+        total = count_cache.get(count_key) if count_mode == 'approx' else None
 
-        return jsonify({
+        # 多取一行用于判断是否还有下一页
+        params.extend([limit + 1, offset])
+        if total is None and count_mode != 'none':
+            stamp = count_cache.stamp(ORDER_COUNT_TAGS)
+            orders, count_result = db_manager.execute_batch([
+                (sql, params),
+                (count_sql, count_params)
+            ], use_primary=True)
+            total = count_result[0]['total'] if count_result else 0
+            count_cache.set(count_key, total, stamp)
+        else:
+            orders = db_manager.execute_query(sql, params, use_primary=True)
+        has_more = len(orders) > limit
+        orders = orders[:limit]
+        
+        # 处理图片JSON
+        for order in orders:
+            images = parse_json_array(order.get('item_images'))
+            order['item_images'] = [to_public_url(variant_url(img, 'thumb'), request.host_url) for img in images]
+
+        return conditional_json({
             'orders': orders,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
-        }), 200
+            'pagination': pagination(page, limit, total, has_more)
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -213,70 +236,83 @@ def update_order_status(order_id):
         if not new_status or not user_id:
             return jsonify({'error': 'status and user_id are required'}), 400
         
-        # 获取订单信息
-        order_sql = """
-        SELECT buyer_id, seller_id, order_status, payment_method
-        FROM `order` 
-        WHERE order_id = %s
-        """
-        order_result = db_manager.execute_query(order_sql, (order_id,))
-        
-        if not order_result:
-            return jsonify({'error': 'Order not found'}), 404
-        
-        order = order_result[0]
-        current_status = order['order_status']
-        
-        # 验证权限
-        if user_id not in [order['buyer_id'], order['seller_id']]:
-            return jsonify({'error': 'Permission denied'}), 403
-        
-        # 验证状态流转
-        valid_transitions = {
-            'pending_payment': ['paid', 'cancelled'],
-            'paid': ['shipped', 'cancelled'],
-            'shipped': ['completed'],
-            'completed': [],
-            'cancelled': []
-        }
-        
-        if new_status not in valid_transitions.get(current_status, []):
-            return jsonify({'error': f'Invalid status transition from {current_status} to {new_status}'}), 400
-        
-        # 更新订单状态
-        update_fields = ['order_status = %s']
-        params = [new_status]
-        
-        # 根据状态更新相应的时间字段
-        if new_status == 'paid':
-            update_fields.append('payment_time = %s')
-            params.append(datetime.now())
-        elif new_status == 'shipped':
-            update_fields.append('ship_time = %s')
-            params.append(datetime.now())
-        elif new_status == 'completed':
-            update_fields.append('complete_time = %s')
-            params.append(datetime.now())
-        
-        update_sql = f"""
-        UPDATE `order` 
-        SET {', '.join(update_fields)}
-        WHERE order_id = %s
-        """
-        params.append(order_id)
-        
-        db_manager.execute_update(update_sql, params)
-        
-        # 如果订单取消，恢复商品状态
-        if new_status == 'cancelled':
-            restore_item_sql = "UPDATE item SET status = 'available' WHERE item_id = (SELECT item_id FROM `order` WHERE order_id = %s)"
-            db_manager.execute_update(restore_item_sql, (order_id,))
+        with db_manager.transaction():
+            # 获取订单信息
+            order_sql = """
+            SELECT o.buyer_id, o.seller_id, o.order_status, o.payment_method, o.item_id, i.category_id
+            FROM `order` o
+            JOIN item i ON o.item_id = i.item_id
+            WHERE o.order_id = %s
+            FOR UPDATE
+            """
+            order_result = db_manager.execute_query(order_sql, (order_id,))
+        
+            if not order_result:
+                return jsonify({'error': 'Order not found'}), 404
+        
+            order = order_result[0]
+            current_status = order['order_status']
+        
+            # 验证权限
+            if user_id not in [order['buyer_id'], order['seller_id']]:
+                return jsonify({'error': 'Permission denied'}), 403
+        
+            # 验证状态流转
+            valid_transitions = {
+                'pending_payment': ['paid', 'cancelled'],
+                'paid': ['shipped', 'cancelled'],
+                'shipped': ['completed'],
+                'completed': [],
+                'cancelled': []
+            }
         
-        # 如果订单完成，更新用户信用分
+            if new_status not in valid_transitions.get(current_status, []):
+                return jsonify({'error': f'Invalid status transition from {current_status} to {new_status}'}), 400
+        
+            # 更新订单状态
+            update_fields = ['order_status = %s']
+            params = [new_status]
+        
+            # 根据状态更新相应的时间字段
+            if new_status == 'paid':
+                update_fields.append('payment_time = %s')
+                params.append(datetime.now())
+            elif new_status == 'shipped':
+                update_fields.append('ship_time = %s')
+                params.append(datetime.now())
+            elif new_status == 'completed':
+                update_fields.append('complete_time = %s')
+                params.append(datetime.now())
+        
+            update_sql = f"""
+            UPDATE `order` 
+            SET {', '.join(update_fields)}
+            WHERE order_id = %s
+            """
+            params.append(order_id)
+        
+            db_manager.execute_update(update_sql, params)
+        
+            # 如果订单取消，恢复商品状态
+            restored = 0
+            if new_status == 'cancelled':
+                restore_item_sql = "UPDATE item SET status = 'available' WHERE item_id = %s"
+                restored = db_manager.execute_update(restore_item_sql, (order['item_id'],))
+        
+            # 如果订单完成，更新用户信用分
+            if new_status == 'completed':
+                # 买家和卖家都增加信用分
+                update_credit_sql = "UPDATE user SET credit_score = LEAST(100, COALESCE(credit_score, 80) + 1) WHERE user_id IN (%s, %s)"
+                db_manager.execute_update(update_credit_sql, (order['buyer_id'], order['seller_id']))
+        if restored:
+            category_tree.adjust(order['category_id'], 1)
+            count_cache.invalidate('item')
+            listing_cache.invalidate('item')
+            item_detail_cache.invalidate(f"item:{order['item_id']}")
+            suggest_index.refresh(order['item_id'])
         if new_status == 'completed':
-            # 买家和卖家都增加信用分
-            update_credit_sql = "UPDATE user SET credit_score = LEAST(100, COALESCE(credit_score, 80) + 1) WHERE user_id IN (%s, %s)"
-            db_manager.execute_update(update_credit_sql, (order['buyer_id'], order['seller_id']))
+            item_detail_cache.invalidate(f"user:{order['buyer_id']}", f"user:{order['seller_id']}")
+        count_cache.invalidate('order')
         
         return jsonify({'message': 'Order status updated successfully'}), 200
         
@@ -312,6 +348,7 @@ def update_payment_status(order_id):
         payment_time = datetime.now() if payment_status == 'paid' else None
         
         db_manager.execute_update(update_sql, (payment_status, payment_time, new_order_status, order_id))
+        count_cache.invalidate('order')
         
         return jsonify({'message': 'Payment status updated successfully'}), 200
         
@@ -328,38 +365,47 @@ def cancel_order(order_id):
         if not user_id:
             return jsonify({'error': 'user_id is required'}), 400
         
-        # 获取订单信息
-        order_sql = """
-        SELECT buyer_id, seller_id, order_status, item_id
-        FROM `order` 
-        WHERE order_id = %s
-        """
-        order_result = db_manager.execute_query(order_sql, (order_id,))
-        
-        if not order_result:
-            return jsonify({'error': 'Order not found'}), 404
-        
-        order = order_result[0]
-        
-        # 验证权限
-        if user_id not in [order['buyer_id'], order['seller_id']]:
-            return jsonify({'error': 'Permission denied'}), 403
-        
-        # 验证是否可以取消
-        if order['order_status'] in ['completed', 'cancelled']:
-            return jsonify({'error': 'Order cannot be cancelled'}), 400
-        
-        # 取消订单
-        cancel_sql = """
-        UPDATE `order` 
-        SET order_status = 'cancelled'
-        WHERE order_id = %s
-        """
-        db_manager.execute_update(cancel_sql, (order_id,))
-        
-        # 恢复商品状态
-        restore_item_sql = "UPDATE item SET status = 'available' WHERE item_id = %s"
-        db_manager.execute_update(restore_item_sql, (order['item_id'],))
+        with db_manager.transaction():
+            # 获取订单信息
+            order_sql = """
+            SELECT o.buyer_id, o.seller_id, o.order_status, o.item_id, i.category_id
+            FROM `order` o
+            JOIN item i ON o.item_id = i.item_id
+            WHERE o.order_id = %s
+            FOR UPDATE
+            """
+            order_result = db_manager.execute_query(order_sql, (order_id,))
+        
+            if not order_result:
+                return jsonify({'error': 'Order not found'}), 404
+        
+            order = order_result[0]
+        
+            # 验证权限
+            if user_id not in [order['buyer_id'], order['seller_id']]:
+                return jsonify({'error': 'Permission denied'}), 403
+        
+            # 验证是否可以取消
+            if order['order_status'] in ['completed', 'cancelled']:
+                return jsonify({'error': 'Order cannot be cancelled'}), 400
+        
+            # 取消订单
+            cancel_sql = """
+            UPDATE `order` 
+            SET order_status = 'cancelled'
+            WHERE order_id = %s
+            """
+            db_manager.execute_update(cancel_sql, (order_id,))
+        
+            # 恢复商品状态
+            restore_item_sql = "UPDATE item SET status = 'available' WHERE item_id = %s"
+            restored = db_manager.execute_update(restore_item_sql, (order['item_id'],))
+        if restored:
+            category_tree.adjust(order['category_id'], 1)
+        count_cache.invalidate('item', 'order')
+        listing_cache.invalidate('item')
+        item_detail_cache.invalidate(f"item:{order['item_id']}")
+        suggest_index.refresh(order['item_id'])
         
         return jsonify({'message': 'Order cancelled successfully'}), 200
         
@@ -385,19 +431,17 @@ def get_order_statistics():
             SUM(CASE WHEN seller_id = %s THEN 1 ELSE 0 END) as seller_total_sales,
             SUM(CASE WHEN seller_id = %s AND order_status = 'completed' THEN 1 ELSE 0 END) as seller_completed_sales,
             SUM(CASE WHEN seller_id = %s AND order_status = 'pending_payment' THEN 1 ELSE 0 END) as seller_pending_sales,
-            COALESCE(SUM(CASE WHEN seller_id = %s AND order_status = 'completed' THEN total_amount ELSE 0 END), 0) as total_earned
+            COALESCE(SUM(CASE WHEN seller_id = %s AND order_status = 'completed' THEN total_amount ELSE 0 END), 0) as total_earned,
+            (SELECT COUNT(*) FROM wishlist WHERE user_id = %s) as wishlist_count
         FROM `order`
         WHERE buyer_id = %s OR seller_id = %s
         """
 
-        # 传递10个参数（用户ID重复使用）
-        params = (user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id, user_id)
-        result = db_manager.execute_query(combined_stats_sql, params)
+        # 传递11个参数（用户ID重复使用）；收藏数作为标量子查询，与订单统计在同一条语句中查询
+        params = (user_id,) * 11
 
-        # 获取收藏数（单独查询，但只需一次）
-        wishlist_sql = "SELECT COUNT(*) as wishlist_count FROM wishlist WHERE user_id = %s"
-        wishlist_result = db_manager.execute_query(wishlist_sql, (user_id,))
-        wishlist_count = wishlist_result[0]['wishlist_count'] if wishlist_result else 0
+        result = db_manager.execute_query(combined_stats_sql, params)
+        wishlist_count = result[0]['wishlist_count'] if result else 0
 
         if result and result[0]:
             row = result[0]
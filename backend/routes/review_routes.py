@@ -4,6 +4,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from db import db_manager
+from cache import item_detail_cache
 
 review_bp = Blueprint('review', __name__)
 
@@ -28,74 +29,77 @@ def create_review():
         if not isinstance(rating, int) or rating < 1 or rating > 5:
             return jsonify({'error': 'Rating must be between 1 and 5'}), 400
 
-        # 获取订单信息
-        order_sql = """
-        SELECT buyer_id, seller_id, order_status
-        FROM `order`
-        WHERE order_id = %s
-        """
-        order_result = db_manager.execute_query(order_sql, (order_id,))
-
-        if not order_result:
-            return jsonify({'error': 'Order not found'}), 404
+        # 校验、写入评价与信用分更新在同一事务中完成
+        with db_manager.transaction():
+            # 获取订单信息
+            order_sql = """
+            SELECT buyer_id, seller_id, order_status
+            FROM `order`
+            WHERE order_id = %s
+            """
+            order_result = db_manager.execute_query(order_sql, (order_id,))
 
-        order = order_result[0]
+            if not order_result:
+                return jsonify({'error': 'Order not found'}), 404
 
-        # 验证订单状态必须是已完成
-        if order['order_status'] != 'completed':
-            return jsonify({'error': 'Can only review completed orders'}), 400
+            order = order_result[0]
 
-        # 验证评价者必须是买家或卖家
-        if reviewer_id not in [order['buyer_id'], order['seller_id']]:
-            return jsonify({'error': 'Only buyer or seller can review this order'}), 403
+            # 验证订单状态必须是已完成
+            if order['order_status'] != 'completed':
+                return jsonify({'error': 'Can only review completed orders'}), 400
 
-        # 确定被评价者
-        if reviewer_id == order['buyer_id']:
-            reviewee_id = order['seller_id']
-        else:
-            reviewee_id = order['buyer_id']
-
-        # 检查是否已经评价过
-        check_sql = """
-        SELECT review_id FROM review
-        WHERE order_id = %s AND reviewer_id = %s
-        """
-        existing = db_manager.execute_query(check_sql, (order_id, reviewer_id))
-
-        if existing:
-            return jsonify({'error': 'You have already reviewed this order'}), 400
-
-        # 创建评价
-        insert_sql = """
-        INSERT INTO review (order_id, reviewer_id, reviewee_id, rating, content)
-        VALUES (%s, %s, %s, %s, %s)
-        """
+            # 验证评价者必须是买家或卖家
+            if reviewer_id not in [order['buyer_id'], order['seller_id']]:
+                return jsonify({'error': 'Only buyer or seller can review this order'}), 403
 
-        review_id = db_manager.execute_insert(insert_sql, (
-            order_id,
-            reviewer_id,
-            reviewee_id,
-            rating,
-            content
-        ))
-
-        # 根据评分更新被评价者的信用分
-        # 1分: -10, 2分: -3, 3分: 0, 4分: +1, 5分: +3
-        credit_change = {5: 3, 4: 1, 3: 0, 2: -3, 1: -10}
-        change = credit_change.get(rating, 0)
-
-        if change != 0:
-            if change > 0:
-                update_credit_sql = """
-                UPDATE user SET credit_score = LEAST(100, COALESCE(credit_score, 80) + %s)
-                WHERE user_id = %s
-                """
+            # 确定被评价者
+            if reviewer_id == order['buyer_id']:
+                reviewee_id = order['seller_id']
             else:
-                update_credit_sql = """
-                UPDATE user SET credit_score = GREATEST(0, COALESCE(credit_score, 80) + %s)
-                WHERE user_id = %s
-                """
-            db_manager.execute_update(update_credit_sql, (change, reviewee_id))
+                reviewee_id = order['buyer_id']
+
+            # 检查是否已经评价过
+            check_sql = """
+            SELECT review_id FROM review
+            WHERE order_id = %s AND reviewer_id = %s
+            """
+            existing = db_manager.execute_query(check_sql, (order_id, reviewer_id))
+
+            if existing:
+                return jsonify({'error': 'You have already reviewed this order'}), 400
+
+            # 创建评价
+            insert_sql = """
+            INSERT INTO review (order_id, reviewer_id, reviewee_id, rating, content)
+            VALUES (%s, %s, %s, %s, %s)
+            """
+
+            review_id = db_manager.execute_insert(insert_sql, (
+                order_id,
+                reviewer_id,
+                reviewee_id,
+                rating,
+                content
+            ))
+
+            # 根据评分更新被评价者的信用分
+            # 1分: -10, 2分: -3, 3分: 0, 4分: +1, 5分: +3
+            credit_change = {5: 3, 4: 1, 3: 0, 2: -3, 1: -10}
+            change = credit_change.get(rating, 0)
+
+            if change != 0:
+                if change > 0:
+                    update_credit_sql = """
+                    UPDATE user SET credit_score = LEAST(100, COALESCE(credit_score, 80) + %s)
+                    WHERE user_id = %s
+                    """
+                else:
+                    update_credit_sql = """
+                    UPDATE user SET credit_score = GREATEST(0, COALESCE(credit_score, 80) + %s)
+                    WHERE user_id = %s
+                    """
+                db_manager.execute_update(update_credit_sql, (change, reviewee_id))
+        item_detail_cache.invalidate(f'user:{reviewee_id}')
 
         return jsonify({
             'message': 'Review created successfully',
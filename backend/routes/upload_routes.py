@@ -3,7 +3,7 @@ import os
 import sys
 
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from media import ITEM_UPLOAD_DIR, save_upload_image
+from media import ITEM_UPLOAD_DIR, resolve_variant_file, save_upload_image
 
 upload_bp = Blueprint("upload", __name__)
 
@@ -44,4 +44,4 @@ def upload_item_images():
 def get_item_image(filename: str):
     if not filename:
         abort(404)
-    return send_from_directory(ITEM_UPLOAD_DIR, filename)
+    return send_from_directory(ITEM_UPLOAD_DIR, resolve_variant_file(filename))
@@ -5,6 +5,7 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from db import db_manager
+from cache import item_detail_cache
 
 user_bp = Blueprint('user', __name__)
 INITIAL_CREDIT_SCORE = 80
@@ -154,7 +155,8 @@ def get_user(user_id):
         FROM user 
         WHERE user_id = %s AND status != 'deleted'
         """
-        users = db_manager.execute_query(sql, (user_id,))
+        # 修改资料后立即刷新，读主库
+        users = db_manager.execute_query(sql, (user_id,), use_primary=True)
         
         if not users:
             return jsonify({'error': 'User not found'}), 404
@@ -221,6 +223,7 @@ def update_user(user_id):
         
         if rows_affected == 0:
             return jsonify({'error': 'User not found'}), 404
+        item_detail_cache.invalidate(f'user:{user_id}')
         
         return jsonify({'message': 'User updated successfully'}), 200
         
@@ -314,6 +317,7 @@ def update_credit(user_id):
         
         if rows_affected == 0:
             return jsonify({'error': 'User not found'}), 404
+        item_detail_cache.invalidate(f'user:{user_id}')
         
         return jsonify({'message': 'Credit score updated successfully'}), 200
         
@@ -4,10 +4,22 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from db import db_manager
-from media import parse_json_array, to_public_url
+from media import parse_json_array, to_public_url, variant_url
+from cache import count_cache, item_detail_cache, get_count_mode, pagination
+from conditional import conditional_json
 
 wishlist_bp = Blueprint('wishlist', __name__)
 
+# 收藏列表总数依赖的表（按商品状态过滤）
+WISHLIST_COUNT_TAGS = ('wishlist', 'item')
+
+# item.wishlist_count 随收藏增删同步维护（偏差由 app.reconcile_wishlist_counts 定期校准）
+INCREMENT_WISHLIST_COUNT_SQL = "UPDATE item SET wishlist_count = wishlist_count + 1 WHERE item_id = %s"
+DECREMENT_WISHLIST_COUNT_SQL = """
+UPDATE item SET wishlist_count = GREATEST(wishlist_count - 1, 0)
+WHERE item_id IN ({placeholders})
+"""
+
 @wishlist_bp.route('/', methods=['POST'])
 def add_to_wishlist():
     """添加收藏 - INSERT操作"""
@@ -62,7 +74,12 @@ def add_to_wishlist():
         VALUES (%s, %s, %s)
         """
         
-        wishlist_id = db_manager.execute_insert(insert_sql, (user_id, item_id, notes))
+        with db_manager.transaction():
+            wishlist_id = db_manager.execute_insert(insert_sql, (user_id, item_id, notes))
+            # 同步维护商品收藏数
+            db_manager.execute_update(INCREMENT_WISHLIST_COUNT_SQL, (item_id,))
+        count_cache.invalidate('wishlist')
+        item_detail_cache.invalidate(f'item:{item_id}')
         
         return jsonify({
             'message': 'Item added to wishlist successfully',
@@ -81,6 +98,7 @@ def get_wishlist(user_id):
         category_id = request.args.get('category_id')
         sort_by = request.args.get('sort_by', 'add_time')  # add_time, price
         sort_order = request.args.get('sort_order', 'DESC')
+        count_mode = get_count_mode(request.args)
         
         offset = (page - 1) * limit
         
@@ -118,33 +136,42 @@ def get_wishlist(user_id):
         LIMIT %s OFFSET %s
         """
         
-        params.extend([limit, offset])
-        wishlist_items = db_manager.execute_query(sql, params)
-        
-        # 处理图片JSON
-        for item in wishlist_items:
-            images = parse_json_array(item.get('images'))
-            item['images'] = [to_public_url(img, request.host_url) for img in images]
-        
-        # 获取总数
+        # 获取总数（命中缓存或 count=none 时不查询）
         count_sql = f"""
         SELECT COUNT(*) as total
         FROM wishlist w
         JOIN item i ON w.item_id = i.item_id
         WHERE {where_clause}
         """
-        count_result = db_manager.execute_query(count_sql, params[:-2])  # 排除limit和offset参数
-        total = count_result[0]['total']
+        count_params = list(params)
+        count_key = ('wishlist', where_clause, tuple(count_params))
+        total = count_cache.get(count_key) if count_mode == 'approx' else None
+        
+        # 多取一行用于判断是否还有下一页
+        params.extend([limit + 1, offset])
+        if total is None and count_mode != 'none':
+            stamp = count_cache.stamp(WISHLIST_COUNT_TAGS)
+            # 总数写入缓存，从主库读取
+            wishlist_items, count_result = db_manager.execute_batch([
+                (sql, params),
+                (count_sql, count_params)
+            ], use_primary=True)
+            total = count_result[0]['total'] if count_result else 0
+            count_cache.set(count_key, total, stamp)
+        else:
+            wishlist_items = db_manager.execute_query(sql, params)
+        has_more = len(wishlist_items) > limit
+        wishlist_items = wishlist_items[:limit]
         
-        return jsonify({
+        # 处理图片JSON
+        for item in wishlist_items:
+            images = parse_json_array(item.get('images'))
+            item['images'] = [to_public_url(variant_url(img, 'thumb'), request.host_url) for img in images]
+        
+        return conditional_json({
             'wishlist': wishlist_items,
-            'pagination': {
-                'page': page,
-                'limit': limit,
-                'total': total,
-                'pages': (total + limit - 1) // limit
-            }
-        }), 200
+            'pagination': pagination(page, limit, total, has_more)
+        })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -166,10 +193,15 @@ def remove_from_wishlist():
         WHERE user_id = %s AND item_id = %s
         """
         
-        rows_affected = db_manager.execute_update(delete_sql, (user_id, item_id))
+        with db_manager.transaction():
+            rows_affected = db_manager.execute_update(delete_sql, (user_id, item_id))
+            if rows_affected > 0:
+                db_manager.execute_update(DECREMENT_WISHLIST_COUNT_SQL.format(placeholders='%s'), (item_id,))
         
         if rows_affected == 0:
             return jsonify({'error': 'Item not found in wishlist'}), 404
+        count_cache.invalidate('wishlist')
+        item_detail_cache.invalidate(f'item:{item_id}')
         
         return jsonify({'message': 'Item removed from wishlist successfully'}), 200
         
@@ -192,7 +224,8 @@ def check_wishlist_status():
         WHERE user_id = %s AND item_id = %s
         """
         
-        result = db_manager.execute_query(check_sql, (user_id, item_id))
+        # 收藏/取消后立即刷新状态，读主库
+        result = db_manager.execute_query(check_sql, (user_id, item_id), use_primary=True)
         
         if result:
             return jsonify({
@@ -227,7 +260,23 @@ def batch_remove_from_wishlist():
         """
         
         params = [user_id] + item_ids
-        rows_affected = db_manager.execute_update(delete_sql, params)
+        with db_manager.transaction():
+            # 先锁定实际存在的收藏记录，只为真正删除的商品减少收藏数
+            lock_sql = f"""
+            SELECT item_id FROM wishlist
+            WHERE user_id = %s AND item_id IN ({placeholders})
+            FOR UPDATE
+            """
+            removed = db_manager.execute_query(lock_sql, params, result='tuple')
+            rows_affected = db_manager.execute_update(delete_sql, params)
+            if removed:
+                removed_ids = [row[0] for row in removed]
+                db_manager.execute_update(
+                    DECREMENT_WISHLIST_COUNT_SQL.format(placeholders=','.join(['%s'] * len(removed_ids))),
+                    removed_ids
+                )
+        count_cache.invalidate('wishlist')
+        item_detail_cache.invalidate(*(f'item:{row[0]}' for row in removed))
         
         return jsonify({
             'message': 'Items removed from wishlist successfully',
@@ -275,14 +324,6 @@ def update_wishlist_notes(wishlist_id):
 def get_wishlist_statistics(user_id):
     """获取收藏统计信息"""
     try:
-        # 总收藏数
-        total_sql = """
-        SELECT COUNT(*) as total_count
-        FROM wishlist w
-        JOIN item i ON w.item_id = i.item_id
-        WHERE w.user_id = %s AND i.status != 'removed'
-        """
-        
         # 按分类统计
         category_sql = """
         SELECT c.category_name, COUNT(*) as count
@@ -294,7 +335,7 @@ def get_wishlist_statistics(user_id):
         ORDER BY count DESC
         """
         
-        # 按状态统计
+        # 按状态统计（总收藏数由各状态的计数求和，不再单独查询）
         status_sql = """
         SELECT i.status, COUNT(*) as count
         FROM wishlist w
@@ -303,12 +344,15 @@ def get_wishlist_statistics(user_id):
         GROUP BY i.status
         """
         
-        total_result = db_manager.execute_query(total_sql, (user_id,))
-        category_stats = db_manager.execute_query(category_sql, (user_id,))
-        status_stats = db_manager.execute_query(status_sql, (user_id,))
+        # 两条统计相互独立，一次往返执行
+        category_stats, status_stats = db_manager.execute_batch([
+            (category_sql, (user_id,)),
+            (status_sql, (user_id,))
+        ])
+        total_count = sum(row['count'] for row in status_stats if row['status'] != 'removed')
         
         return jsonify({
-            'total_count': total_result[0]['total_count'] if total_result else 0,
+            'total_count': total_count,
             'category_stats': category_stats,
             'status_stats': status_stats
         }), 200
@@ -321,8 +365,8 @@ def get_item_wishlist_count(item_id):
     """获取商品被收藏次数"""
     try:
         sql = """
-        SELECT COUNT(*) as wishlist_count
-        FROM wishlist 
+        SELECT wishlist_count
+        FROM item
         WHERE item_id = %s
         """
         
@@ -0,0 +1,175 @@
+import bisect
+import heapq
+import threading
+import time
+
+from db import db_manager
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时只按标题原文补全
+    lazy_pinyin = None
+
+# 每次查询最多扫描的前缀匹配条目数（保证查询耗时有上界）
+MAX_SCAN = 500
+
+# 排序权重：浏览次数 + 收藏数 * WISHLIST_WEIGHT
+WISHLIST_WEIGHT = 10
+
+# 检索键最多保留的字符数（每个汉字起始的后缀都是一个键，截断后每个标题占用的内存与长度成线性）；
+# 更长的前缀先按截断部分查找，再用完整标题核对
+KEY_LENGTH = 16
+
+
+def _is_cjk(char):
+    return '\u4e00' <= char <= '\u9fff'
+
+
+def title_keys(title, length=KEY_LENGTH):
+    """标题的检索键（小写，截断为 length 个字符，None 表示不截断）：
+    从每个词首和每个汉字开始的后缀，以及标题的全拼与拼音首字母"""
+    title = ' '.join(title.lower().split())
+    keys = set()
+    for index, char in enumerate(title):
+        if char != ' ' and (index == 0 or title[index - 1] == ' ' or _is_cjk(char)):
+            keys.add(title[index:][:length])
+    if lazy_pinyin is not None:
+        keys.add(''.join(lazy_pinyin(title)).replace(' ', '')[:length])
+        keys.add(''.join(lazy_pinyin(title, style=Style.FIRST_LETTER)).replace(' ', '')[:length])
+    keys.discard('')
+    return keys
+
+
+class SuggestIndex:
+    """在售商品标题的前缀索引（标题补全）
+
+    (检索键, item_id) 有序数组 + 二分查找，命中的商品按浏览数和收藏数排序。
+    商品新增/修改/状态变化时由接口调用 refresh() 增量更新；每 refresh_interval 秒
+    从数据库完整重建一次（同时更新排序权重）。只有首次加载阻塞查询，之后的重建在
+    后台线程中进行，期间继续使用旧索引，建好后整体替换。
+    """
+
+    def __init__(self, db, refresh_interval=600):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self._entries = None
+        self._items = {}
+        self._loaded_at = 0.0
+        # 重建期间 refresh() 过的商品（重建读到的可能是旧数据，替换后需要重新读取）
+        self._stale = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def suggest(self, prefix, limit=10):
+        """返回标题匹配前缀的商品 [{'item_id', 'title'}]，按权重降序"""
+        prefix = ' '.join(prefix.lower().split())
+        if not prefix:
+            return []
+        self._ensure_loaded()
+        key_prefix = prefix[:KEY_LENGTH]
+        with self._lock:
+            entries = self._entries
+            matched = set()
+            index = bisect.bisect_left(entries, (key_prefix,))
+            while index < len(entries) and len(matched) < MAX_SCAN:
+                key, item_id = entries[index]
+                if not key.startswith(key_prefix):
+                    break
+                matched.add(item_id)
+                index += 1
+            if len(prefix) > KEY_LENGTH:
+                matched = {item_id for item_id in matched
+                           if any(key.startswith(prefix) for key in title_keys(self._items[item_id][0] or '', None))}
+            best = heapq.nlargest(limit, matched, key=lambda item_id: self._items[item_id][1])
+            return [{'item_id': item_id, 'title': self._items[item_id][0]} for item_id in best]
+
+    def refresh(self, *item_ids):
+        """重新读取指定商品：在售的加入或更新，其余从索引中移除（索引未加载时忽略）"""
+        if self._entries is None or not item_ids:
+            return
+        try:
+            placeholders = ','.join(['%s'] * len(item_ids))
+            sql = f"""
+            SELECT item_id, title, view_count, wishlist_count
+            FROM item
+            WHERE item_id IN ({placeholders}) AND status = 'available'
+            """
+            rows = self.db.execute_query(sql, item_ids, use_primary=True, result='tuple')
+        except Exception as e:
+            print(f"[标题补全] 更新商品 {item_ids} 失败: {e}")
+            return
+        available = {row[0]: row for row in rows}
+        with self._lock:
+            if self._stale is not None:
+                self._stale.update(item_ids)
+            for item_id in item_ids:
+                self._remove(item_id)
+                if item_id in available:
+                    self._add(*available[item_id])
+
+    def _ensure_loaded(self):
+        if self._entries is None:
+            with self._load_lock:
+                if self._entries is None:
+                    self._load()
+        elif time.monotonic() - self._loaded_at >= self.refresh_interval and self._load_lock.acquire(blocking=False):
+            threading.Thread(target=self._reload, daemon=True).start()
+
+    def _reload(self):
+        """后台重建（调用方已持有 _load_lock）"""
+        try:
+            self._load()
+        except Exception as e:
+            # 失败时沿用旧索引，等下一个周期再重建
+            with self._lock:
+                self._stale = None
+                self._loaded_at = time.monotonic()
+            print(f"[标题补全] 重建索引失败: {e}")
+        finally:
+            self._load_lock.release()
+
+    def _load(self):
+        sql = """
+        SELECT item_id, title, view_count, wishlist_count
+        FROM item
+        WHERE status = 'available'
+        """
+        with self._lock:
+            if self._entries is not None:
+                self._stale = set()
+        items = {}
+        entries = []
+        for item_id, title, view_count, wishlist_count in self.db.execute_stream(sql, result='tuple'):
+            keys = title_keys(title or '')
+            items[item_id] = (title, (view_count or 0) + (wishlist_count or 0) * WISHLIST_WEIGHT, keys)
+            entries.extend((key, item_id) for key in keys)
+        entries.sort()
+
+        with self._lock:
+            self._entries = entries
+            self._items = items
+            self._loaded_at = time.monotonic()
+            stale, self._stale = self._stale, None
+        if stale:
+            self.refresh(*stale)
+
+    def _add(self, item_id, title, view_count, wishlist_count):
+        keys = title_keys(title or '')
+        self._items[item_id] = (title, (view_count or 0) + (wishlist_count or 0) * WISHLIST_WEIGHT, keys)
+        for key in keys:
+            bisect.insort(self._entries, (key, item_id))
+
+    def _remove(self, item_id):
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        for key in item[2]:
+            index = bisect.bisect_left(self._entries, (key, item_id))
+            if index < len(self._entries) and self._entries[index] == (key, item_id):
+                del self._entries[index]
+
+
+suggest_index = SuggestIndex(
+    db_manager,
+    refresh_interval=db_manager.config.getfloat('cache', 'suggest_refresh_interval', fallback=600)
+)
@@ -0,0 +1,117 @@
+import atexit
+import threading
+import time
+
+from db import db_manager, chunked
+
+# 每条 UPDATE 最多合并的商品数
+FLUSH_BATCH_SIZE = 500
+
+
+class ViewCounter:
+    """商品浏览次数写回缓冲
+
+    详情页只在内存中按 item_id 累加浏览次数，由后台线程每 flush_interval 秒
+    （或累计 max_pending 次浏览后立即）用一条 CASE UPDATE 批量写回，
+    热门商品的详情页不再对同一行加锁写入。进程退出时写回剩余的计数。
+
+    本进程的累计数供详情缓存叠加浏览次数使用；商品超过 retention 秒（详情缓存有效期）
+    无人浏览且计数已写回后，缓存条目必然已过期，累计数随之丢弃。
+    """
+
+    def __init__(self, db, flush_interval=5, max_pending=1000, retention=300):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.retention = retention
+        self._pending = {}
+        self._totals = {}  # item_id -> (累计浏览次数, 最近一次浏览的时间)
+        self._events = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, item_id, count=1):
+        """记录浏览（不访问数据库）"""
+        with self._lock:
+            self._pending[item_id] = self._pending.get(item_id, 0) + count
+            self._totals[item_id] = (self._totals.get(item_id, (0,))[0] + count, time.monotonic())
+            self._events += count
+            full = self._events >= self.max_pending
+            if self._thread is None:
+                self._start()
+        if full:
+            self._wakeup.set()
+
+    def counts(self, item_id):
+        """(尚未写回的浏览次数, 本进程累计记录的浏览次数)
+
+        缓存的详情文档记录 数据库浏览次数 + 未写回数 - 累计数，之后每次读取加上当时的累计数，
+        即可得到最新的浏览次数，写回数据库不影响结果。
+        """
+        with self._lock:
+            return self._pending.get(item_id, 0), self._totals.get(item_id, (0,))[0]
+
+    def flush(self):
+        """把缓冲的浏览次数写回数据库，返回写回的商品数；失败的增量放回缓冲，下次再写"""
+        with self._flush_lock:
+            with self._lock:
+                self._forget_idle()
+                pending, self._pending = self._pending, {}
+                self._events = 0
+            if not pending:
+                return 0
+
+            item_ids = sorted(pending)
+            for index, batch in enumerate(chunked(item_ids, FLUSH_BATCH_SIZE)):
+                cases = ' '.join(['WHEN %s THEN %s'] * len(batch))
+                placeholders = ','.join(['%s'] * len(batch))
+                sql = f"""
+                UPDATE item
+                SET view_count = view_count + CASE item_id {cases} END,
+                    update_date = update_date
+                WHERE item_id IN ({placeholders})
+                """
+                params = []
+                for item_id in batch:
+                    params.extend([item_id, pending[item_id]])
+                params.extend(batch)
+                try:
+                    self.db.execute_update(sql, params)
+                except Exception as e:
+                    print(f"[浏览计数] 写回失败，保留 {len(item_ids) - index * FLUSH_BATCH_SIZE} 个商品的计数: {e}")
+                    with self._lock:
+                        for item_id in item_ids[index * FLUSH_BATCH_SIZE:]:
+                            self._pending[item_id] = self._pending.get(item_id, 0) + pending[item_id]
+                            self._events += pending[item_id]
+                    return index * FLUSH_BATCH_SIZE
+            return len(item_ids)
+
+    def _forget_idle(self):
+        """丢弃超过 retention 秒无人浏览、且没有未写回增量的商品的累计数（调用方需持有锁）"""
+        cutoff = time.monotonic() - self.retention
+        idle = [item_id for item_id, (_, viewed_at) in self._totals.items()
+                if viewed_at < cutoff and item_id not in self._pending]
+        for item_id in idle:
+            del self._totals[item_id]
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='view-counter', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """后台线程：定期或缓冲满时写回"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+view_counter = ViewCounter(
+    db_manager,
+    flush_interval=db_manager.config.getfloat('view_counter', 'flush_interval', fallback=5),
+    max_pending=db_manager.config.getint('view_counter', 'max_pending', fallback=1000),
+    retention=db_manager.config.getfloat('cache', 'detail_ttl', fallback=300)
+)
+atexit.register(view_counter.flush)
@@ -51,6 +51,7 @@ CREATE TABLE item (
     update_date DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT '更新时间',
     status ENUM('available', 'sold', 'removed') DEFAULT 'available' COMMENT '商品状态',
     view_count INT DEFAULT 0 COMMENT '浏览次数',
+    wishlist_count INT NOT NULL DEFAULT 0 COMMENT '收藏次数',
     
     -- 约束
     CONSTRAINT chk_price CHECK (price > 0),
@@ -64,9 +65,18 @@ CREATE TABLE item (
     -- 索引
     INDEX idx_user_id (user_id),
     INDEX idx_category_id (category_id),
-    INDEX idx_status (status),
     INDEX idx_publish_date (publish_date),
-    FULLTEXT INDEX idx_title_desc (title, description)
+    INDEX idx_user_status (user_id, status),
+    -- 商品列表/搜索按 (状态[, 分类], 排序列) 有序读取，见迁移 003、004
+    INDEX idx_status_publish (status, publish_date),
+    INDEX idx_status_view (status, view_count),
+    INDEX idx_status_wishlist (status, wishlist_count, item_id),
+    INDEX idx_status_category_publish (status, category_id, publish_date),
+    INDEX idx_status_category_price (status, category_id, price),
+    INDEX idx_status_category_view (status, category_id, view_count),
+    INDEX idx_status_category_wishlist (status, category_id, wishlist_count),
+    -- ngram 解析器支持中文分词，见迁移 002
+    FULLTEXT INDEX idx_title_desc (title, description) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COMMENT='商品表';
 
 -- 4. 地址表 (Address)
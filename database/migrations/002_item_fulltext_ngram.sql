@@ -0,0 +1,14 @@
+-- 数据库迁移脚本: 商品全文索引改用 ngram 解析器
+-- 用途: 默认全文解析器按空格和标点分词，无法切分中文标题；改用 ngram 解析器后
+--       商品搜索（MATCH ... AGAINST）可以使用该索引，不再对 title/description 做 LIKE 全表扫描
+-- 说明: 分词长度由服务端参数 ngram_token_size 决定（默认 2），短于该长度的关键词由后端回退到 LIKE
+-- 执行时间: 2026-10-18
+
+-- 1. 删除原有全文索引（默认解析器）
+ALTER TABLE item DROP INDEX idx_title_desc;
+
+-- 2. 使用 ngram 解析器重建全文索引
+ALTER TABLE item ADD FULLTEXT INDEX idx_title_desc (title, description) WITH PARSER ngram;
+
+-- 验证修改
+SHOW INDEX FROM item WHERE Key_name = 'idx_title_desc';
@@ -0,0 +1,19 @@
+-- 数据库迁移脚本: 商品表增加收藏数计数列
+-- 用途: 商品列表/搜索/详情不再对每行执行 (SELECT COUNT(*) FROM wishlist ...) 相关子查询，
+--       按收藏数排序可以直接走 (status, wishlist_count, item_id) 索引
+-- 说明: 收藏/取消收藏接口在同一事务中维护该列，后端定期任务按 wishlist 表校准偏差
+-- 执行时间: 2026-10-18
+
+-- 1. 增加收藏数列
+ALTER TABLE item ADD COLUMN wishlist_count INT NOT NULL DEFAULT 0 COMMENT '收藏次数' AFTER view_count;
+
+-- 2. 按现有收藏记录回填
+UPDATE item i
+LEFT JOIN (SELECT item_id, COUNT(*) AS cnt FROM wishlist GROUP BY item_id) w ON w.item_id = i.item_id
+SET i.wishlist_count = COALESCE(w.cnt, 0);
+
+-- 3. 按收藏数排序的索引
+ALTER TABLE item ADD INDEX idx_status_wishlist (status, wishlist_count, item_id);
+
+-- 验证修改
+SELECT item_id, wishlist_count FROM item ORDER BY wishlist_count DESC LIMIT 10;
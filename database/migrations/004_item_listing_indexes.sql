@@ -0,0 +1,33 @@
+-- 数据库迁移脚本: 商品列表/搜索的复合索引
+-- 用途: 商品列表与搜索的ID查询形如
+--         SELECT i.item_id, i.<排序列> FROM item i
+--         WHERE i.status = ? [AND i.category_id = ?] ... ORDER BY i.<排序列>, i.item_id LIMIT ?
+--       为每种 (过滤, 排序) 组合提供 (status[, category_id], 排序列) 索引，
+--       由索引范围扫描按序读取并在 LIMIT 行后停止，不再回表排序（filesort）
+-- 说明: InnoDB 二级索引末尾隐含主键 item_id，因此 item_id 平局排序同样由索引保证；
+--       只按状态/分类过滤时 ID查询只读索引，带价格区间、新旧程度等条件时仍需对扫描到的
+--       每个索引项回表读取该列判断，索引只保证按序读取、免去 filesort；
+--       (status, price) 已在初始结构中创建，(status, wishlist_count) 见 003 迁移
+-- 执行时间: 2026-10-18
+
+-- 1. 全部分类：按发布时间 / 浏览量排序
+ALTER TABLE item ADD INDEX idx_status_publish (status, publish_date);
+ALTER TABLE item ADD INDEX idx_status_view (status, view_count);
+
+-- 2. 指定分类：按发布时间 / 价格 / 浏览量 / 收藏数排序
+ALTER TABLE item ADD INDEX idx_status_category_publish (status, category_id, publish_date);
+ALTER TABLE item ADD INDEX idx_status_category_price (status, category_id, price);
+ALTER TABLE item ADD INDEX idx_status_category_view (status, category_id, view_count);
+ALTER TABLE item ADD INDEX idx_status_category_wishlist (status, category_id, wishlist_count);
+
+-- 3. 用户发布的商品：WHERE user_id = ? AND status = ? ORDER BY item_id DESC
+ALTER TABLE item ADD INDEX idx_user_status (user_id, status);
+
+-- 4. idx_status 是以上索引的前缀，删除以减少写入开销
+ALTER TABLE item DROP INDEX idx_status;
+
+-- 验证修改
+SHOW INDEX FROM item;
+EXPLAIN SELECT item_id, publish_date FROM item
+WHERE status = 'available' AND category_id = 1
+ORDER BY publish_date DESC, item_id DESC LIMIT 21;
@@ -0,0 +1,124 @@
+"""测试用的假数据库：替换 pymysql.connect、配置文件读取与 CA 证书加载，不需要真实数据库"""
+import configparser
+import os
+import ssl
+import sys
+from unittest import mock
+
+import pymysql
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+TEST_CONFIG = """
+[database]
+host = primary
+port = 3306
+database = test
+username = test
+password = test
+[ssl]
+ca_file = ca-bundle.pem
+check_hostname = false
+[pool]
+min_size = 0
+max_size = 2
+borrow_timeout = 1
+"""
+
+
+class FakeCursor(pymysql.cursors.Cursor):
+    """respond(host, sql, params) 返回字典行（写语句可直接返回影响行数）；元组游标按列顺序转换为元组行
+
+    参数转义与 executemany 的多行 INSERT 改写沿用 pymysql 的实现，execute 不访问网络。
+    """
+
+    def __init__(self, conn, cursor_class=None):
+        super().__init__(conn)
+        self.tuples = cursor_class is pymysql.cursors.Cursor
+        self.rows = []
+        self.lastrowid = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if isinstance(sql, (bytes, bytearray)):
+            sql = bytes(sql).decode(self.connection.encoding)
+        self.connection.executed.append((sql, params))
+        rows = self.connection.respond(self.connection.host, sql, params) or []
+        if isinstance(rows, int):
+            # 写语句：respond 直接返回影响行数
+            rows, self.rowcount = [], rows
+        else:
+            rows = list(rows)
+            self.rowcount = len(rows) or 1
+        self.description = tuple((key,) for key in rows[0]) if rows else ()
+        self.rows = [tuple(row.values()) for row in rows] if self.tuples else rows
+        return self.rowcount
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+
+class FakeConnection:
+    def __init__(self, host='primary', respond=None):
+        self.host = host
+        self.respond = respond or (lambda host, sql, params: [])
+        self.executed = []
+        self.open = True
+        self.pings = 0
+        self.encoding = 'utf8'
+
+    def literal(self, obj):
+        return pymysql.converters.escape_item(obj, 'utf8mb4')
+
+    def escape(self, obj, mapping=None):
+        return self.literal(obj)
+
+    def cursor(self, cursor_class=None):
+        return FakeCursor(self, cursor_class)
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+def patch_database(test, config=TEST_CONFIG, respond=None):
+    """在 test 的生命周期内替换配置读取、CA 证书加载与 pymysql.connect，返回记录所有新建连接的列表"""
+    connections = []
+
+    def read_config(parser, *args, **kwargs):
+        parser.read_string(config)
+
+    def connect(**kwargs):
+        conn = FakeConnection(kwargs.get('host'), respond)
+        connections.append(conn)
+        return conn
+
+    patches = [
+        mock.patch.object(configparser.ConfigParser, 'read', read_config),
+        mock.patch.object(ssl.SSLContext, 'load_verify_locations', lambda *args, **kwargs: None),
+        mock.patch.object(pymysql, 'connect', connect),
+    ]
+    for patch in patches:
+        patch.start()
+        test.addCleanup(patch.stop)
+    return connections
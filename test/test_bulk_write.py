@@ -0,0 +1,59 @@
+"""批量写入测试：execute_many 把 INSERT 改写为按字节数分块的多行 VALUES 语句
+
+运行（在项目根目录下）: python -m unittest discover -s test
+"""
+import unittest
+
+from fake_db import TEST_CONFIG, patch_database
+
+INSERT_SQL = "INSERT INTO wishlist (user_id, item_id, notes) VALUES (%s, %s, %s)"
+
+
+def respond(host, sql, params):
+    # 多行 INSERT 影响的行数等于 VALUES 中的行数
+    if sql.startswith('INSERT'):
+        return sql.count('),(') + 1
+    return 1
+
+
+class ExecuteManyTest(unittest.TestCase):
+    def setUp(self):
+        config = TEST_CONFIG.replace('password = test', 'password = test\nmax_statement_bytes = 200')
+        self.connections = patch_database(self, config, respond)
+
+        import db
+        self.db = db.DatabaseManager()
+
+    def executed(self):
+        return [sql for conn in self.connections for sql, params in conn.executed]
+
+    def test_insert_rewritten_as_multi_row_values(self):
+        rows = [(1, 10, 'a'), (1, 11, "it's")]
+        self.assertEqual(self.db.execute_many(INSERT_SQL, rows), 2)
+        self.assertEqual(self.executed(), [
+            "INSERT INTO wishlist (user_id, item_id, notes) VALUES (1, 10, 'a'),(1, 11, 'it\\'s')"
+        ])
+
+    def test_insert_chunked_by_max_statement_bytes(self):
+        rows = [(1, item_id, 'x' * 20) for item_id in range(20)]
+        self.assertEqual(self.db.execute_many(INSERT_SQL, rows), 20)
+        statements = self.executed()
+        self.assertGreater(len(statements), 1)
+        for sql in statements:
+            self.assertLessEqual(len(sql.encode('utf-8')), self.db.max_statement_bytes)
+            self.assertTrue(sql.startswith("INSERT INTO wishlist (user_id, item_id, notes) VALUES (1, "))
+        self.assertEqual(sum(sql.count('),(') + 1 for sql in statements), 20)
+
+    def test_update_executed_once_per_row_on_one_connection(self):
+        sql = "UPDATE item SET wishlist_count = 0 WHERE item_id BETWEEN %s AND %s"
+        self.assertEqual(self.db.execute_many(sql, [(1, 10), (11, 20), (21, 30)]), 3)
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(len(self.executed()), 3)
+
+    def test_empty_params_skip_database(self):
+        self.assertEqual(self.db.execute_many(INSERT_SQL, []), 0)
+        self.assertEqual(self.connections, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
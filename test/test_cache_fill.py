@@ -0,0 +1,75 @@
+"""缓存回填回归测试：写入缓存的数据从主库读取，副本延迟的旧数据不会被缓存整个有效期
+
+运行（在项目根目录下）: python -m unittest discover -s test
+"""
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from werkzeug.datastructures import MultiDict
+
+from fake_db import TEST_CONFIG, patch_database
+
+REPLICA_CONFIG = TEST_CONFIG.replace('password = test', 'password = test\nreplicas = replica:3306')
+
+
+def respond(host, sql, params):
+    """副本上的商品标题还是修改前的旧值"""
+    if 'SHOW SLAVE STATUS' in sql:
+        return [{'Seconds_Behind_Master': 0}]
+    if 'COUNT(*)' in sql:
+        return [{'total': 1}]
+    if 'AS sort_key' in sql:
+        return [{'item_id': 1, 'sort_key': datetime(2026, 1, 1)}]
+    if 'FROM item i' in sql:
+        title = 'old title' if host == 'replica' else 'new title'
+        return [{'item_id': 1, 'user_id': 2, 'title': title, 'images': None, 'view_count': 0}]
+    return []
+
+
+class CacheFillTest(unittest.TestCase):
+    def setUp(self):
+        self.connections = patch_database(self, REPLICA_CONFIG, respond)
+
+        import db
+        from routes import item_routes
+        from cache import item_detail_cache, listing_cache
+        from view_counter import ViewCounter
+        self.item_routes = item_routes
+        self.db = db.DatabaseManager()
+        item_detail_cache.clear()
+        listing_cache.clear()
+        self.addCleanup(item_detail_cache.clear)
+        self.addCleanup(listing_cache.clear)
+        counter = ViewCounter(self.db, flush_interval=3600)
+        patch = mock.patch.object(item_routes, 'view_counter', counter)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def replica_item_queries(self):
+        return [sql for conn in self.connections if conn.host == 'replica'
+                for sql, params in conn.executed if 'item' in sql]
+
+    def test_uncached_read_uses_replica(self):
+        rows = self.db.execute_query("SELECT title FROM item i WHERE item_id = %s", (1,))
+        self.assertEqual(rows[0]['title'], 'old title')
+
+    def test_item_detail_cache_filled_from_primary(self):
+        from query_plan import run_plan
+        for _ in range(2):
+            body, status = run_plan(self.item_routes.item_detail_plan(1, 'http://test/'), self.db)
+            self.assertEqual(status, 200)
+            self.assertEqual(body['item']['title'], 'new title')
+        self.assertEqual(self.replica_item_queries(), [])
+
+    def test_listing_cache_filled_from_primary(self):
+        from query_plan import run_plan
+        for _ in range(2):
+            body, status = run_plan(self.item_routes.list_items_plan(MultiDict(), 'http://test/'), self.db)
+            self.assertEqual(status, 200)
+            self.assertEqual([item['title'] for item in body['items']], ['new title'])
+        self.assertEqual(self.replica_item_queries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
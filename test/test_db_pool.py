@@ -0,0 +1,186 @@
+"""连接池测试：借用超时、空闲回收、最大存活时间、借出前检查，以及请求级连接的复用
+
+不需要真实数据库：pymysql.connect 替换为内存中的假连接，配置由测试提供。
+运行（在项目根目录下）: python -m unittest discover -s test
+"""
+import threading
+import time
+import unittest
+
+from flask import Flask
+
+from fake_db import TEST_CONFIG, FakeConnection, patch_database
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        patch_database(self)
+
+        import db
+        self.db = db
+        self.created = []
+
+    def create(self):
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+    def make_pool(self, **kwargs):
+        options = dict(min_size=0, max_size=2, idle_timeout=300, max_lifetime=3600,
+                       ping_on_borrow=False, borrow_timeout=1)
+        options.update(kwargs)
+        return self.db.ConnectionPool(self.create, **options)
+
+    def test_released_connection_is_reused(self):
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(len(self.created), 1)
+
+    def test_borrow_times_out_when_exhausted(self):
+        pool = self.make_pool(max_size=1, borrow_timeout=0.1)
+        pool.acquire()
+        start = time.monotonic()
+        with self.assertRaises(self.db.PoolTimeoutError):
+            pool.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_release_wakes_waiting_borrower(self):
+        pool = self.make_pool(max_size=1, borrow_timeout=2)
+        conn = pool.acquire()
+        borrowed = []
+        waiter = threading.Thread(target=lambda: borrowed.append(pool.acquire()))
+        waiter.start()
+        time.sleep(0.05)
+        pool.release(conn)
+        waiter.join(1)
+        self.assertEqual(borrowed, [conn])
+
+    def test_idle_connections_beyond_min_size_are_reaped(self):
+        pool = self.make_pool(min_size=1, idle_timeout=0.05)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        time.sleep(0.1)
+        # 最久未用的连接被关闭，min_size 个连接保留
+        self.assertIs(pool.acquire(), second)
+        self.assertFalse(first.open)
+        self.assertEqual(pool.stats(), {'size': 1, 'idle': 0, 'in_use': 1, 'max_size': 2})
+
+    def test_connection_past_max_lifetime_is_not_reused(self):
+        pool = self.make_pool(max_lifetime=0.05)
+        conn = pool.acquire()
+        time.sleep(0.1)
+        pool.release(conn)
+        self.assertFalse(conn.open)
+        self.assertEqual(pool.stats()['size'], 0)
+
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.1)
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertFalse(conn.open)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_ping_on_borrow_replaces_broken_connection(self):
+        pool = self.make_pool(ping_on_borrow=True, ping_interval=0)
+        conn = pool.acquire()
+        pool.release(conn)
+        self.assertIs(pool.acquire(), conn)
+        self.assertEqual(conn.pings, 1)
+        pool.release(conn)
+
+        def broken_ping(reconnect=False):
+            raise ConnectionError('server has gone away')
+        conn.ping = broken_ping
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_discarded_connection_frees_its_slot(self):
+        pool = self.make_pool(max_size=1, borrow_timeout=0.1)
+        conn = pool.acquire()
+        pool.discard(conn)
+        self.assertFalse(conn.open)
+        self.assertIsNot(pool.acquire(), conn)
+
+
+class RequestConnectionTest(unittest.TestCase):
+    def setUp(self):
+        patch_database(self)
+
+        import db
+        self.db = db.DatabaseManager()
+        self.app = Flask(__name__)
+        self.db.init_app(self.app)
+
+    def read_then_write(self, barrier, errors):
+        try:
+            with self.app.test_request_context():
+                self.db.execute_query("SELECT status FROM item WHERE item_id = %s", (1,))
+                # 两个请求都读过之后再写，确保读连接在写之前仍被占用
+                barrier.wait()
+                self.db.execute_update("UPDATE item SET status = 'removed' WHERE item_id = %s", (1,))
+                self.app.do_teardown_request()
+        except Exception as e:
+            errors.append(e)
+
+    def test_request_reuses_one_connection_until_teardown(self):
+        with self.app.test_request_context():
+            self.db.execute_query("SELECT 1")
+            self.db.execute_query("SELECT 2")
+            self.assertEqual(self.db.pool.stats()['in_use'], 1)
+            self.app.do_teardown_request()
+        self.assertEqual(self.db.pool.stats(), {'size': 1, 'idle': 1, 'in_use': 0, 'max_size': 2})
+
+    def test_read_falls_back_to_request_primary_connection(self):
+        with self.app.test_request_context():
+            self.db.execute_query("SELECT 1")
+            self.db.execute_update("UPDATE item SET view_count = view_count + 1")
+            self.assertEqual(self.db.pool.stats()['in_use'], 1)
+            self.app.do_teardown_request()
+        self.assertEqual(self.db.pool.stats()['in_use'], 0)
+
+    def test_concurrent_read_then_write_within_pool_size(self):
+        barrier = threading.Barrier(self.db.pool.max_size, timeout=5)
+        errors = []
+        threads = [threading.Thread(target=self.read_then_write, args=(barrier, errors))
+                   for _ in range(self.db.pool.max_size)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.db.pool.stats()['in_use'], 0)
+
+
+class ReplicaCheckTest(unittest.TestCase):
+    def setUp(self):
+        config = TEST_CONFIG.replace('password = test', 'password = test\nreplicas = replica:3306')
+        patch_database(self, config, lambda host, sql, params: [{'Seconds_Behind_Master': 0}])
+
+        import db
+        self.db = db.DatabaseManager()
+        self.replica = self.db.replicas[0]
+
+    def test_lag_probe_does_not_block_on_saturated_replica_pool(self):
+        held = [self.replica.pool.acquire() for _ in range(self.replica.pool.max_size)]
+        self.addCleanup(lambda: [self.replica.pool.release(conn) for conn in held])
+        start = time.monotonic()
+        self.assertIs(self.db._choose_replica(), self.replica)
+        self.assertLess(time.monotonic() - start, self.replica.pool.borrow_timeout / 2)
+
+    def test_lag_probe_updates_replica_in_background(self):
+        self.db._choose_replica()
+        # 探测锁在启动后台线程前取得，探测结束后才释放
+        self.assertTrue(self.replica.lock.acquire(timeout=1))
+        self.replica.lock.release()
+        self.assertEqual(self.replica.lag, 0)
+        self.assertTrue(self.replica.healthy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""keyset 分页测试：游标的编码/解析（含畸形与被篡改的游标）与 keyset 条件的 SQL 及参数
+
+运行（在项目根目录下）: python -m unittest discover -s test
+"""
+import base64
+import json
+import unittest
+from datetime import datetime
+
+from werkzeug.datastructures import MultiDict
+
+from fake_db import patch_database
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+class CursorTest(unittest.TestCase):
+    def setUp(self):
+        patch_database(self)
+
+        import item_listing
+        self.listing = item_listing
+
+    def test_round_trip_for_every_sort_field(self):
+        values = {
+            'publish_date': datetime(2026, 10, 18, 12, 30),
+            'price': 199.5,
+            'view_count': 42,
+            'wishlist_count': 0,
+        }
+        for sort_by in self.listing.SORT_FIELDS:
+            for sort_order in ('ASC', 'DESC'):
+                cursor = self.listing.encode_cursor(sort_by, sort_order, values[sort_by], 7)
+                self.assertNotIn('=', cursor)
+                sort_value, item_id = self.listing.decode_cursor(cursor, sort_by, sort_order)
+                self.assertEqual(item_id, 7)
+                # 日期按字符串编码，由数据库与列比较
+                expected = str(values[sort_by]) if sort_by == 'publish_date' else values[sort_by]
+                self.assertEqual(sort_value, expected)
+
+    def test_relevance_cursor_round_trip(self):
+        cursor = self.listing.encode_cursor('relevance', 'DESC', 3.25, 11)
+        self.assertEqual(self.listing.decode_cursor(cursor, 'relevance', 'DESC'), (3.25, 11))
+
+    def test_cursor_for_other_sort_is_rejected(self):
+        cursor = self.listing.encode_cursor('price', 'ASC', 10, 1)
+        with self.assertRaisesRegex(ValueError, 'does not match'):
+            self.listing.decode_cursor(cursor, 'price', 'DESC')
+        with self.assertRaisesRegex(ValueError, 'does not match'):
+            self.listing.decode_cursor(cursor, 'view_count', 'ASC')
+
+    def test_malformed_cursors_are_rejected(self):
+        malformed = [
+            '',
+            'not a cursor!',
+            raw_cursor(b'\xff\xfe'),
+            raw_cursor(b'{"sort_by": "price"}'),
+            raw_cursor(json.dumps(['price', 'ASC', 10]).encode()),
+            raw_cursor(json.dumps(['price', 'ASC', 10, 'abc']).encode()),
+            raw_cursor(json.dumps(['price', 'ASC', 10, None]).encode()),
+        ]
+        for cursor in malformed:
+            with self.assertRaisesRegex(ValueError, 'Invalid cursor', msg=cursor):
+                self.listing.decode_cursor(cursor, 'price', 'ASC')
+
+    def test_tampered_cursor_value_stays_a_parameter(self):
+        injected = "0) OR 1=1 -- "
+        cursor = raw_cursor(json.dumps(['price', 'ASC', injected, 5]).encode())
+        sort_value, item_id = self.listing.decode_cursor(cursor, 'price', 'ASC')
+        sql, params = self.listing.keyset_condition('i.price', 'ASC', sort_value, item_id)
+        self.assertNotIn(injected, sql)
+        self.assertEqual(params, [injected, injected, 5])
+
+    def test_invalid_cursor_returns_400_without_querying(self):
+        from query_plan import run_plan
+        item_filter = self.listing.ItemFilter()
+        item_filter.add("i.status = %s", 'available')
+        plan = self.listing.listing_plan(item_filter, MultiDict({'cursor': 'garbage'}), 'http://test/')
+        self.assertEqual(run_plan(plan, db=None), ({'error': 'Invalid cursor'}, 400))
+
+
+class KeysetConditionTest(unittest.TestCase):
+    def setUp(self):
+        patch_database(self)
+
+        import item_listing
+        self.listing = item_listing
+
+    def test_descending_order(self):
+        sql, params = self.listing.keyset_condition('i.publish_date', 'DESC', '2026-10-18 12:00:00', 9)
+        self.assertEqual(sql, "(i.publish_date < %s OR (i.publish_date = %s AND i.item_id < %s))")
+        self.assertEqual(params, ['2026-10-18 12:00:00', '2026-10-18 12:00:00', 9])
+
+    def test_ascending_order(self):
+        sql, params = self.listing.keyset_condition('i.price', 'ASC', 10, 3)
+        self.assertEqual(sql, "(i.price > %s OR (i.price = %s AND i.item_id > %s))")
+        self.assertEqual(params, [10, 10, 3])
+
+    def test_relevance_expression_parameters(self):
+        match_query = '+"笔记本"'
+        sql, params = self.listing.keyset_condition(
+            self.listing.RELEVANCE_SQL, 'DESC', 2.5, 4, expr_params=[match_query])
+        self.assertEqual(sql.count('%s'), len(params))
+        self.assertEqual(params, [match_query, 2.5, match_query, 2.5, 4])
+        self.assertTrue(sql.startswith(f"({self.listing.RELEVANCE_SQL} < %s OR "))
+
+
+if __name__ == '__main__':
+    unittest.main()